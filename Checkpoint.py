@@ -0,0 +1,45 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""Checkpoint  saves the progress of a long ensemble run to disk, to resume it after a crash.
+
+The progress is the number of chunks of samples done and the state of the statistics.
+The samples of a chunk depend only on its position in the ensemble, so the random generators
+need no saving, and a resumed run gives the same results as an uninterrupted one.
+The file is replaced atomically, a crash while saving leaves the previous checkpoint.
+"""
+
+import os
+import pickle
+import tempfile
+
+
+class Checkpoint():
+    """A file holding the progress of the ensemble run identified by key."""
+
+    def __init__(self, path, key):
+        """Use the file at path for the run identified by key."""
+        self.path = path
+        self.key = key
+
+    def load(self):
+        """Return (chunks done, state) of the run, or (0, None) if there is no checkpoint yet."""
+        try:
+            with open(self.path, 'rb') as file:
+                saved = pickle.load(file)
+        except FileNotFoundError:
+            return 0, None
+        if saved['key'] != self.key:
+            raise ValueError("Checkpoint: " + self.path + " belongs to another ensemble run, or "
+                             "to another version of the code, remove it or use another file.")
+        return saved['done'], saved['state']
+
+    def save(self, done, state):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as file:
+            pickle.dump({'key': self.key, 'done': done, 'state': state}, file)
+        os.replace(temporary, self.path)
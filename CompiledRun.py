@@ -0,0 +1,115 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""CompiledRun  holds the linear coefficients of the model, for instant re-evaluation.
+
+Given the plan, the discount rate, the plant accounting life and the heat rate,
+ - costs are linear in construction cost, fixed and variable operating cost and heat price,
+ - emissions are linear in the emission factor, capture in the capture factor,
+ - the carbon cost is linear in the carbon price, for a given emission factor.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from init import pd, sources, years, discount_factors
+from init import kW, MW, USD, MUSD, GWh, MWh, kWh, Btu, MBtu, TBtu, g, t, kt, Mt, Gt
+
+from Parameter import ParameterArrays, batch_shape
+from Run import Run
+
+Evaluation = namedtuple('Evaluation', ['total_cost', 'lcoe', 'total_emissions',
+                                       'total_capture', 'total_external_cost'])
+
+
+def dot(field, weight):
+    """Scalar product on the (year, source) axes, leading axes of field broadcast."""
+    return field.reshape(field.shape[:-2] + (-1,)) @ weight.reshape(-1)
+
+
+class CompiledRun():
+    """The totals of a run as linear functions of the parameter time series.
+
+    Compiled once for a plan and the structure of a parameter: its discount rate,
+    plant accounting life and heat rate.
+
+    cost_weights     discounted M$ per unit of each linear cost parameter, (year, source) arrays
+    evaluate(p)      Evaluation of the totals for a Parameter, or for a stacked ParameterArrays
+    lcoe_gradient()  derivative of the LCOE with respect to each (year, source) parameter cell
+    """
+
+    structure = ['discount_rate', 'plant_accounting_life', 'heat_rate']
+
+    def __init__(self, plan, parameter):
+        """Extract the linear coefficients from a lazy Run of plan and parameter."""
+        self.plan = plan
+        self.parameter = parameter
+        run = Run(plan, parameter, lazy=True)
+        p = plan.arrays
+        q = parameter.arrays
+        discount_factor = discount_factors(q.discount_rate)[:, np.newaxis]
+        self.discount_factor = discount_factor
+
+        self.total_production = run.total_production
+        self.constant_cost = - run.total_salvage_value
+
+        self.cost_weights = {
+            'construction_cost': p.additions * MW * USD / kW / MUSD * discount_factor,
+            'fixed_operating_cost': p.capacities * MW * USD / kW / MUSD * discount_factor,
+            'variable_operating_cost': p.production * GWh * USD / MWh / MUSD * discount_factor,
+            'heat_price': run.heat_used_array * TBtu * USD / MBtu / MUSD * discount_factor}
+
+        self.emission_weights = p.production_history.sum(axis=0) * GWh * g / kWh / kt * kt / Gt
+        self.capture_weights = p.production * GWh * g / kWh / kt * kt / Mt * Mt / Gt
+        self.carbon_weights = (p.production * GWh * g / kWh / kt * kt * USD / t / MUSD
+                               * discount_factor)
+
+    def check(self, arrays):
+        """Raise ValueError if the parameter structure is not the compiled one."""
+        for name in self.structure:
+            field, compiled = getattr(arrays, name), getattr(self.parameter.arrays, name)
+            if field is not compiled and not np.all(field == compiled):
+                raise ValueError("CompiledRun: " + name + " differs from the compiled one, "
+                                 "compile a new CompiledRun.")
+
+    def evaluate(self, parameters):
+        """Return the Evaluation of the totals of the run for other parameters.
+
+        parameters is a Parameter, or a ParameterArrays maybe stacked on leading axes,
+        the results are then arrays over the ensemble.
+        """
+        arrays = parameters if isinstance(parameters, ParameterArrays) else parameters.arrays
+        self.check(arrays)
+        total_cost = self.constant_cost
+        for name, weight in self.cost_weights.items():
+            total_cost = total_cost + dot(getattr(arrays, name), weight)
+        total_emissions = arrays.emission_factor @ self.emission_weights
+        total_capture = dot(arrays.capture_factor, self.capture_weights)
+        emission_cost = arrays.emission_factor @ self.carbon_weights.T
+        total_external_cost = (arrays.carbon_price * emission_cost).sum(axis=-1)
+        results = [total_cost, total_emissions, total_capture, total_external_cost]
+        if isinstance(parameters, ParameterArrays):
+            shape = batch_shape(arrays)
+            results = [np.broadcast_to(result, shape) for result in results]
+        return Evaluation(results[0], results[0] / self.total_production, *results[1:])
+
+    def lcoe_gradient(self, parameter=None):
+        """Return the derivatives of the LCOE as a dict of Dataframes, by parameter name.
+
+        The derivative with respect to the heat rate is taken at the heat price of parameter,
+        by default the compiled one. The other derivatives are constant.
+        """
+        if parameter is None:
+            parameter = self.parameter
+        heat_price = parameter.arrays.heat_price
+        gradient = {name: weight / self.total_production
+                    for name, weight in self.cost_weights.items()}
+        gradient['heat_rate'] = (self.plan.arrays.production * GWh * Btu / kWh
+                                 * heat_price * USD / MBtu / MUSD
+                                 * self.discount_factor / self.total_production)
+        return {name: pd.DataFrame(value, index=years, columns=sources)
+                for name, value in gradient.items()}
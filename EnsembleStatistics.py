@@ -0,0 +1,224 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""EnsembleStatistics  summarizes a Monte Carlo ensemble as samples arrive, in bounded memory.
+
+Samples are arrays of a given shape, for example () for the LCOE or (year, source) for costs.
+They arrive in batches stacked on a leading axis. The statistics are computed cell by cell:
+ - Moments      count, mean and variance, batch by batch with the Welford-Chan updates,
+ - Quantiles    exact while the ensemble is small, then from a compacted weighted sample,
+ - Histogram    counts in fixed bins, with the samples below and above the bins.
+Statistics of the same kind merge, so that ensembles can be summarized in pieces.
+"""
+
+import numpy as np
+
+
+class Moments():
+    """Count, mean and variance of the samples, updated in one pass."""
+
+    def __init__(self, shape=()):
+        """Start with no samples, each of the given shape."""
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, samples):
+        """Add a batch of samples, stacked on the first axis."""
+        if len(samples):
+            mean = samples.mean(axis=0)
+            self.add(len(samples), mean, ((samples - mean) ** 2).sum(axis=0))
+
+    def merge(self, other):
+        """Add the samples summarized by another Moments, of the same shape."""
+        if other.count:
+            self.add(other.count, other.mean, other.m2)
+
+    def add(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * count / total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    @property
+    def variance(self):
+        """Unbiased estimate of the variance."""
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+
+class Quantiles():
+    """Quantiles of the samples for the given probabilities, in bounded memory.
+
+    Samples are kept in levels, a sample in level L stands for 2**L samples. When a level
+    holds more than capacity samples, it is sorted in each cell and every other sample
+    moves up one level, alternately the odd and the even ones (Munro and Paterson 1980).
+    The weights are the same in all the cells, so the updates are vectorized over cells.
+    Until the first compaction, the quantiles are exactly those of np.percentile.
+    Memory is about capacity * log2(count / capacity) samples.
+    """
+
+    def __init__(self, probabilities, shape=(), capacity=1000):
+        """Start with no samples, each of the given shape."""
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.shape = shape
+        self.capacity = max(capacity, 2)
+        self.count = 0
+        self.levels = [np.empty((0,) + shape)]
+        self.compactions = [0]
+
+    @property
+    def exact(self):
+        return len(self.levels) == 1
+
+    def update(self, samples):
+        """Add a batch of samples, stacked on the first axis."""
+        self.count += len(samples)
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(samples, dtype=np.float64)])
+        self.compact()
+
+    def merge(self, other):
+        """Add the samples summarized by another Quantiles, of the same shape."""
+        self.count += other.count
+        for level, kept in enumerate(other.levels):
+            if level == len(self.levels):
+                self.new_level()
+            self.levels[level] = np.concatenate([self.levels[level], kept])
+        self.compact()
+
+    def new_level(self):
+        self.levels.append(np.empty((0,) + self.shape))
+        self.compactions.append(0)
+
+    def compact(self):
+        for level, kept in enumerate(self.levels):
+            if len(kept) > self.capacity:
+                if level == len(self.levels) - 1:
+                    self.new_level()
+                kept = np.sort(kept, axis=0)
+                n_even = len(kept) - len(kept) % 2
+                offset = self.compactions[level] % 2
+                self.compactions[level] += 1
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1],
+                                                         kept[offset:n_even:2]])
+                self.levels[level] = kept[n_even:]
+
+    def quantiles(self, probabilities=None):
+        """Array of the quantiles, the probabilities on the first axis, by default tracked ones.
+
+        The summary keeps the whole distribution, any probability can be asked for.
+        """
+        probabilities = self.probabilities if probabilities is None else np.asarray(probabilities)
+        if self.exact:
+            return np.percentile(self.levels[0], 100 * probabilities, axis=0)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(kept), 2.0**level)
+                                  for level, kept in enumerate(self.levels)])
+        weights = weights.reshape(weights.shape + (1,) * len(self.shape))
+        order = np.argsort(values, axis=0)
+        values = np.take_along_axis(values, order, axis=0)
+        weights = np.take_along_axis(np.broadcast_to(weights, values.shape), order, axis=0)
+        # Rank of the middle of each kept sample, as np.percentile for unit weights
+        ranks = np.cumsum(weights, axis=0) - (weights + 1) / 2
+        result = []
+        for rank in (self.count - 1) * probabilities:
+            below = np.clip((ranks <= rank).sum(axis=0) - 1, 0, len(values) - 2)[np.newaxis]
+            v0, v1, r0, r1 = [np.take_along_axis(a, i, axis=0)[0]
+                              for a in (values, ranks) for i in (below, below + 1)]
+            fraction = np.clip((rank - r0) / (r1 - r0), 0, 1)
+            result.append(v0 + fraction * (v1 - v0))
+        return np.array(result)
+
+    def quantile(self, probability):
+        return self.quantiles()[list(self.probabilities).index(probability)]
+
+    def samples(self):
+        """Return the samples, while the ensemble is small enough to keep them all, else None."""
+        return self.levels[0] if self.exact else None
+
+
+class Histogram():
+    """Counts of the samples in fixed bins, and of the samples below and above the bins."""
+
+    def __init__(self, edges):
+        """Start with empty bins between the edges."""
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.below = 0
+        self.above = 0
+
+    def update(self, samples):
+        samples = np.ravel(samples)
+        self.counts += np.histogram(samples, self.edges)[0]
+        self.below += int(np.count_nonzero(samples < self.edges[0]))
+        self.above += int(np.count_nonzero(samples > self.edges[-1]))
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+
+
+class EnsembleStatistics():
+    """Moments, quantiles and, given bin edges, histogram of an ensemble, in one pass.
+
+    capacity is the number of samples kept exactly before the quantiles are compacted.
+    """
+
+    def __init__(self, shape=(), probabilities=(0.05, 0.5, 0.95), edges=None, capacity=1000):
+        """Start with no samples, each of the given shape."""
+        self.moments = Moments(shape)
+        self.quantiles = Quantiles(probabilities, shape, capacity)
+        self.histogram = None if edges is None else Histogram(edges)
+
+    def update(self, samples):
+        """Add a batch of samples, stacked on the first axis."""
+        samples = np.asarray(samples, dtype=np.float64)
+        self.moments.update(samples)
+        self.quantiles.update(samples)
+        if self.histogram is not None:
+            self.histogram.update(samples)
+
+    def merge(self, other):
+        """Add the samples summarized by another EnsembleStatistics, built alike."""
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        if self.histogram is not None:
+            self.histogram.merge(other.histogram)
+
+    @property
+    def count(self):
+        return self.moments.count
+
+    @property
+    def mean(self):
+        return self.moments.mean
+
+    @property
+    def std(self):
+        return self.moments.std
+
+    def quantile(self, probability):
+        return self.quantiles.quantile(probability)
+
+    def mean_interval(self, z=1.96):
+        """Half width of the normal confidence interval on the mean, 95% by default."""
+        return z * self.std / np.sqrt(self.count)
+
+    def quantile_interval(self, probability, z=1.96):
+        """Half width of the distribution-free confidence interval on a quantile.
+
+        The bounds are the quantiles at probability +- z * sqrt(p (1 - p) / count),
+        the ranks of the order statistics which bracket the quantile.
+        """
+        spread = z * np.sqrt(probability * (1 - probability) / self.count)
+        low, high = self.quantiles.quantiles(np.clip([probability - spread,
+                                                      probability + spread], 0, 1))
+        return (high - low) / 2
@@ -7,35 +7,90 @@
 """Parameter  describes a technical and economic environment."""
 
 from collections import namedtuple
-import hashlib
-
-from init import pd, sources, start_year
-
-
-class Parameter(namedtuple('Parameter',
-                           ['discount_rate',
-                            'plant_accounting_life',
-                            'construction_cost',
-                            'fixed_operating_cost',
-                            'variable_operating_cost',
-                            'heat_rate',
-                            'heat_price',
-                            'emission_factor',
-                            'capture_factor',
-                            'carbon_price'])):
+from functools import cached_property
+
+import numpy as np
+
+from init import pd, sources, years, start_year, content_hash
+
+FIELDS = ['discount_rate',
+          'plant_accounting_life',
+          'construction_cost',
+          'fixed_operating_cost',
+          'variable_operating_cost',
+          'heat_rate',
+          'heat_price',
+          'emission_factor',
+          'capture_factor',
+          'carbon_price']
+
+# Same fields as Parameter, holding float64 arrays: time series are (year, source) or (year,),
+# technology data is (source,) and the discount rate is a scalar.
+ParameterArrays = namedtuple('ParameterArrays', FIELDS)
+
+# Number of dimensions of each field for one Parameter, extra leading axes index an ensemble.
+FIELD_NDIM = ParameterArrays(0, 1, 2, 2, 2, 2, 2, 1, 2, 1)
+
+
+def as_array(data):
+    """Align a Parameter field on years and sources, as a contiguous float64 array.
+
+    Missing values become zeros, as they count for nothing in the pandas sums.
+    """
+    if isinstance(data, pd.DataFrame):
+        data = data.reindex(index=years, columns=sources)
+    elif isinstance(data, pd.Series):
+        data = data.reindex(sources if data.index.isin(sources).any() else years)
+    else:
+        return np.float64(data)
+    return np.ascontiguousarray(data.fillna(0), dtype=np.float64)
+
+
+def stack(parameters):
+    """Stack the arrays of several Parameter on a leading ensemble axis.
+
+    Fields which are equal in all the parameters are not stacked, they broadcast.
+    """
+    stacked = []
+    for column in zip(*[parameter.arrays for parameter in parameters]):
+        if all(np.array_equal(column[0], field) for field in column[1:]):
+            stacked.append(column[0])
+        else:
+            stacked.append(np.stack(column))
+    return ParameterArrays(*stacked)
+
+
+def batch_shape(arrays):
+    """Shape of the ensemble described by a ParameterArrays, () for a single Parameter."""
+    return np.broadcast_shapes(*[np.shape(field)[:np.ndim(field) - ndim]
+                                 for field, ndim in zip(arrays, FIELD_NDIM)])
+
+
+class Parameter(namedtuple('Parameter', FIELDS)):
     """Parameter  describes a technical and economic environment.
 
     Bundle a power generation technology database, carbon price trajectory and discount rate.
     digest      content digest, a short checksum
+    fingerprint content hash, a long checksum
     summary()   contents summary, time series represented by initial level and trend.
     __new__()   constructor, default not extended
     __repr__()  detailed representation as  string, default not extended
 
     """
 
+    @cached_property
+    def fingerprint(self):
+        """Content hash, changes whenever any value changes. The object must not be mutated."""
+        return content_hash(*self)
+
     @property
     def digest(self):
-        return hashlib.md5(self.__repr__().encode('utf-8')).hexdigest()[0:6]
+        return self.fingerprint[0:6]
+
+    @cached_property
+    def arrays(self):
+        """The parameter aligned once on years and sources, see ParameterArrays."""
+        return ParameterArrays(*[as_array(field) for field in self])
 
     def __str__(self):
         return "Parameters #" + self.digest + ": " + self.__doc__
@@ -6,15 +6,44 @@
 #
 """Represent a power development program including history, plan and our extension."""
 from collections import namedtuple
-import hashlib
+from functools import cached_property
 
+import numpy as np
 import matplotlib.pyplot as plt
 
-from init import fuels, sources, technologies, start_year, end_year
+from init import fuels, sources, technologies, years, start_year, end_year, content_hash
 from init import GWh, TWh, MW, GW
 
 # %%
 
+PlanArrays = namedtuple('PlanArrays',
+                        ['additions', 'capacities', 'production',
+                         'additions_history', 'production_history'])
+
+
+def as_array(frame, index):
+    """Frame values aligned on index and sources, as a contiguous float64 array."""
+    return np.ascontiguousarray(frame.reindex(index=index, columns=sources).fillna(0),
+                                dtype=np.float64)
+
+
+def stack(plans):
+    """Stack the arrays of several PowerPlan on a leading axis.
+
+    The histories are padded with zeros in front, to the longest one.
+    """
+    arrays = [plan.arrays for plan in plans]
+    n_history = max(len(plan_arrays.production_history) for plan_arrays in arrays)
+
+    def pad(history):
+        return np.pad(history, ((n_history - len(history), 0), (0, 0)))
+
+    return PlanArrays(np.stack([a.additions for a in arrays]),
+                      np.stack([a.capacities for a in arrays]),
+                      np.stack([a.production for a in arrays]),
+                      np.stack([pad(a.additions_history) for a in arrays]),
+                      np.stack([pad(a.production_history) for a in arrays]))
+
 
 class PowerPlan(namedtuple('PowerPlan',
                            ['additions', 'retirement', 'capacity_factor', 'net_import',
@@ -30,9 +59,32 @@ class PowerPlan(namedtuple('PowerPlan',
         return super().__new__(cls, additions, retirement, capacity_factor, net_import,
                                capacities, production)
 
+    def __getnewargs__(self):
+        """Arguments of __new__, for pickling. The other fields are derived from them."""
+        return tuple(self[0:4])
+
+    @cached_property
+    def fingerprint(self):
+        """Content hash, changes whenever any value changes. The object must not be mutated."""
+        return content_hash(*self)
+
     @property
     def digest(self):
-        return hashlib.md5(self.__repr__().encode('utf-8')).hexdigest()[0:4]
+        return self.fingerprint[0:4]
+
+    @cached_property
+    def arrays(self):
+        """The plan aligned once on sources, as float64 arrays for the Run evaluation core.
+
+        additions, capacities, production                   (year, source) over the model years
+        additions_history, production_history     (plan year, source) from the first plan year
+        """
+        history = range(self.production.index[0], end_year + 1)
+        return PlanArrays(as_array(self.additions, years),
+                          as_array(self.capacities, years),
+                          as_array(self.production, years),
+                          as_array(self.additions, history),
+                          as_array(self.production, history))
 
     def __str__(self):
         """Include a digest of the content."""
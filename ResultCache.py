@@ -0,0 +1,82 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""ResultCache  stores model results on disk, by content digest, with LRU eviction.
+
+Each entry is a dict of float64 arrays saved in one .npz file named after its key.
+Reading an entry marks it as recently used. When the directory grows over max_bytes,
+the least recently used entries are deleted.
+"""
+
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+
+
+class ResultCache():
+    """A size-bounded directory of arrays, keyed by content digests."""
+
+    suffix = '.npz'
+
+    def __init__(self, directory, max_bytes=100 * 2**20):
+        """Use directory, created on the first save, holding at most about max_bytes."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def load(self, key):
+        """Return the dict of arrays stored under key, or None."""
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                result = {name: data[name] for name in data.files}
+            os.utime(path)
+        except (OSError, ValueError, EOFError, zipfile.BadZipFile):
+            return None
+        return result
+
+    def save(self, key, arrays):
+        """Store a dict of arrays under key, then evict old entries if needed."""
+        os.makedirs(self.directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as file:
+                np.savez(file, **arrays)
+            os.replace(temporary, self.path(key))
+        except BaseException:
+            os.remove(temporary)
+            raise
+        self.evict()
+
+    def entries(self):
+        """List of (last use time, size, path) of the entries, oldest first."""
+        result = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(self.suffix):
+                stat = entry.stat()
+                result.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(result)
+
+    def evict(self):
+        """Delete the least recently used entries until the cache fits in max_bytes."""
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            os.remove(path)
@@ -6,111 +6,361 @@
 #
 """Assess the scenarios."""
 
+import os
 import sys
+from collections import namedtuple
+from functools import cached_property, wraps
 
-from init import pd, fuels, sources
-from init import start_year, end_year, years, present_value
+import numpy as np
+
+from init import pd, fuels, sources, content_hash
+from init import start_year, end_year, years, n_year, discount_factors, CACHE_DIR, CACHE_MAX_BYTES
 from init import kW, MW, USD, MUSD, GUSD, GWh, MWh, TWh, kWh, Btu, MBtu, TBtu, g, t, kt, Mt, Gt
 
+import Parameter
+import PowerPlan
+from ResultCache import ResultCache
 from plan_baseline import baseline
 from plan_withCCS import withCCS
 from param_reference import reference
 
+# Source files of the model computations, their digest is part of the keys of cached results
+MODEL_SOURCES = ['Run.py', 'CompiledRun.py', 'Parameter.py', 'PowerPlan.py', 'init.py']
+
+
+def code_digest(filenames=MODEL_SOURCES):
+    """Content digest of the source or data files, relative to the directory of this module."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    contents = []
+    for filename in filenames:
+        with open(os.path.join(directory, filename), 'rb') as file:
+            contents.append(file.read())
+    return content_hash(*contents)
+
 # %% Accounting functions
+#
+# They work on the float64 arrays aligned once by PowerPlan.arrays and Parameter.arrays:
+# annual flows are (..., year, source) arrays, technology data are (..., source) arrays.
+# Leading dimensions index an ensemble of runs, they broadcast.
+
+
+def present_value_of(flow, discount_factor):
+    """Intertemporal total present value of an annual flow, summed on technologies."""
+    return (flow * discount_factor[..., np.newaxis]).sum(axis=-2).sum(axis=-1)
 
 
-def residual_value(additions, plant_accounting_life, technology):
-    """Return the residual value of the generation capacity at model end year.
+def depreciation_weights(plant_accounting_life, n):
+    """Remaining fraction at end year of the capacity added in each of the last n years.
 
-    A Series equal 0 for all years except at the end.
+    Returns a (..., n, source) matrix, its last row is the end year.
     """
-    lifetime = plant_accounting_life[technology]
-    idx = additions.index
-    n = len(idx)
-    remaining_fraction = pd.Series(0, index=idx)
-    for i in range(min(lifetime, n)):
-        # On average, plant opens middle of the year
-        remaining_fraction.iloc[n - i - 1] = 1 - (i + 0.5) / lifetime
-    result = pd.Series(0, index=years, name=technology)
-    result[2050] = (remaining_fraction * additions[technology]).sum()
-    return result
+    lifetimes = np.asarray(plant_accounting_life, dtype=np.float64)[..., np.newaxis, :]
+    age = np.arange(n - 1, -1, -1, dtype=np.float64)[:, np.newaxis]
+    # On average, plant opens middle of the year
+    return np.where(age < lifetimes, 1 - (age + 0.5) / lifetimes, 0)
+
+
+def residual_value(additions, plant_accounting_life):
+    """Return the residual value of the generation capacity at model end year, by source.
+
+    additions is a (..., plan year, source) array whose last row is the end year.
+    """
+    weights = depreciation_weights(plant_accounting_life, additions.shape[-2])
+    return (weights * additions).sum(axis=-2)
 
 # %%
 
 
-class Run():
+# The key results of a run, numbers in TWh, USD/MWh, bn USD, GtCO2eq, GtCO2, bn USD.
+KeyResults = namedtuple('KeyResults',
+                        ['power_produced', 'system_LCOE', 'total_cost', 'construction',
+                         'fuel_cost', 'OM', 'salvage_value', 'CO2_emissions', 'CO2_capture',
+                         'CO2_cost', 'cost_with_CO2'])
+
+
+def total(method):
+    """Make a cached property of a total result, broadcast on the ensemble axes of the run."""
+    @wraps(method)
+    def broadcast(self):
+        value = method(self)
+        return np.broadcast_to(value, self.shape) if self.shape else value
+    return cached_property(broadcast)
+
+
+class ArrayRun():
+    """The model algebra, done on aligned float64 arrays.
+
+    plan_arrays       a PlanArrays, see PowerPlan.arrays
+    parameter_arrays  a ParameterArrays, see Parameter.arrays
+    lazy              if True, each result is computed when first asked for, else all are
+                      computed in the initializer. Results are cached, the API is the same.
+
+    Annual flows are the attributes ending in _array, the totals are present values.
+    The leading dimensions of the parameter arrays, if any, carry over to all the results.
+    """
+
+    shape = ()
+
+    results = ['investment_array', 'salvage_value_array', 'fixed_OM_cost_array',
+               'variable_OM_cost_array', 'heat_used_array', 'fuel_cost_array',
+               'emissions_array', 'capture_array', 'external_cost_array',
+               'total_production', 'total_investment', 'total_salvage_value',
+               'total_fixed_OM_cost', 'total_variable_OM_cost', 'total_fuel_cost', 'total_cost',
+               'lcoe', 'total_emissions', 'total_capture', 'total_external_cost']
+
+    def __init__(self, plan_arrays, parameter_arrays, lazy=False):
+        """Compute all the results, unless lazy."""
+        self.plan_arrays = plan_arrays
+        self.parameter_arrays = parameter_arrays
+        if not lazy:
+            for name in self.results:
+                getattr(self, name)
+
+    @cached_property
+    def discount_factor(self):
+        return discount_factors(self.parameter_arrays.discount_rate)
+
+    def pv(self, flow):
+        """Present value of an annual flow, summed on technologies."""
+        return present_value_of(flow, self.discount_factor)
+
+    @total
+    def total_production(self):
+        return self.pv(self.plan_arrays.production)
+
+    @cached_property
+    def investment_array(self):
+        return (self.plan_arrays.additions * MW
+                * self.parameter_arrays.construction_cost * USD / kW
+                / MUSD)
+
+    @total
+    def total_investment(self):
+        return self.pv(self.investment_array)
+
+    @cached_property
+    def salvage_value_array(self):
+        residual = residual_value(self.plan_arrays.additions_history,
+                                  self.parameter_arrays.plant_accounting_life)
+        salvage_value = np.zeros(residual.shape[:-1] + (n_year, len(sources)))
+        salvage_value[..., -1, :] = residual
+        return salvage_value
+
+    @total
+    def total_salvage_value(self):
+        return self.pv(self.salvage_value_array)
+
+    @cached_property
+    def fixed_OM_cost_array(self):
+        return (self.plan_arrays.capacities * MW
+                * self.parameter_arrays.fixed_operating_cost * USD / kW
+                / MUSD)
+
+    @total
+    def total_fixed_OM_cost(self):
+        return self.pv(self.fixed_OM_cost_array)
+
+    @cached_property
+    def variable_OM_cost_array(self):
+        return (self.plan_arrays.production * GWh
+                * self.parameter_arrays.variable_operating_cost * USD / MWh
+                / MUSD)
+
+    @total
+    def total_variable_OM_cost(self):
+        return self.pv(self.variable_OM_cost_array)
+
+    @cached_property
+    def heat_used_array(self):
+        return (self.plan_arrays.production * GWh
+                * self.parameter_arrays.heat_rate * Btu / kWh
+                / TBtu)
+
+    @cached_property
+    def fuel_cost_array(self):
+        return (self.heat_used_array * TBtu
+                * self.parameter_arrays.heat_price * USD / MBtu
+                / MUSD)
+
+    @total
+    def total_fuel_cost(self):
+        return self.pv(self.fuel_cost_array)
+
+    @total
+    def total_cost(self):
+        return (self.total_investment - self.total_salvage_value
+                + self.total_fixed_OM_cost + self.total_variable_OM_cost
+                + self.total_fuel_cost)
+
+    @total
+    def lcoe(self):
+        return self.total_cost / self.total_production
+
+    @cached_property
+    def emissions_array(self):
+        # Emissions are accounted since the first year of the plan
+        return (self.plan_arrays.production_history * GWh
+                * self.parameter_arrays.emission_factor[..., np.newaxis, :] * g / kWh
+                / kt)
+
+    @total
+    def total_emissions(self):
+        return self.emissions_array.sum(axis=-1).sum(axis=-1) * kt / Gt
+
+    @cached_property
+    def capture_array(self):
+        return (self.plan_arrays.production * GWh
+                * self.parameter_arrays.capture_factor * g / kWh
+                / kt)
+
+    @total
+    def total_capture(self):
+        return (self.capture_array.sum(axis=-1) * kt / Mt).sum(axis=-1) * Mt / Gt
+
+    @cached_property
+    def external_cost_array(self):
+        return (self.emissions_array[..., -n_year:, :].sum(axis=-1) * kt
+                * self.parameter_arrays.carbon_price * USD / t
+                / MUSD)
+
+    @total
+    def total_external_cost(self):
+        return (self.external_cost_array * self.discount_factor).sum(axis=-1)
+
+    @cached_property
+    def cost_array(self):
+        """Cost net of salvage value, by year and source (M$)."""
+        return (self.investment_array - self.salvage_value_array
+                + self.fixed_OM_cost_array + self.variable_OM_cost_array
+                + self.fuel_cost_array)
+
+    @cached_property
+    def annual_cost_array(self):
+        """Cost net of salvage value, by year (M$)."""
+        return self.cost_array.sum(axis=-1)
+
+    @cached_property
+    def key_results(self):
+        """Return the KeyResults of the run: unrounded, in the units of Run.total()."""
+        return KeyResults(self.total_production * GWh / TWh,
+                          self.lcoe * (MUSD / GWh) / (USD / MWh),
+                          self.total_cost * MUSD / GUSD,
+                          self.total_investment * MUSD / GUSD,
+                          self.total_fuel_cost * MUSD / GUSD,
+                          (self.total_fixed_OM_cost + self.total_variable_OM_cost) * MUSD / GUSD,
+                          -self.total_salvage_value * MUSD / GUSD,
+                          self.total_emissions,
+                          self.total_capture,
+                          self.total_external_cost * MUSD / GUSD,
+                          (self.total_cost + self.total_external_cost) * MUSD / GUSD)
+
+
+class Run(ArrayRun):
     """A run of the model.
 
     Computes LCOE and CO2 emissions based on:
          plan       contains the policy control variable, a power generation plan
          parameter  describes the technical and economic environment
+         lazy       compute each result only when first asked for, see ArrayRun
+
+    The model run is an immutable object, the (linear) algebra is done on float64 arrays,
+    see ArrayRun.  The result DataFrames (investment, fuel_cost, emissions ...)
+    are built when first asked for.
 
-    The model run is an immutable object, all the (linear) algebra is done in the initializer.
+    When the class attribute cache is a ResultCache, the results of a non lazy run are
+    loaded from it if the plan and parameter digests are known, else saved to it.
+    The keys include the digest of the model source files, any change of the code of the
+    computations makes new keys, so stale results are never read back.
     """
 
-    def __init__(self, plan, parameter):
+    cache = ResultCache(CACHE_DIR, CACHE_MAX_BYTES) if CACHE_DIR else None
+    cache_version = 'run2'
+    code_version = code_digest()
+
+    def __init__(self, plan, parameter, lazy=False):
         self.plan = plan
         self.parameter = parameter
+        cached = None
+        if self.cache and not lazy:
+            cached = self.cache.load(self.cache_key)
+        if cached:
+            # A 0-d array [()] is a numpy scalar
+            self.__dict__.update({name: value[()] for name, value in cached.items()})
+        super().__init__(plan.arrays, parameter.arrays, lazy)
+        if self.cache and not lazy and not cached:
+            self.cache.save(self.cache_key, {name: getattr(self, name) for name in self.results})
+
+    @property
+    def cache_key(self):
+        return '-'.join([self.cache_version, self.code_version, self.plan.fingerprint,
+                         self.parameter.fingerprint])
+
+    @cached_property
+    def signature(self):
+        return '#' + self.plan.digest + "-" + self.parameter.digest
+
+    def discount_sweep(self, discount_rates):
+        """Dataframe of the run results for each discount rate, in the units of total().
+
+        Annual flows do not depend on the discount rate, all the present values are
+        computed as one (rates x years) by (years x flows) matrix product.
+        """
+        flows = np.stack([self.annual_cost_array,
+                          self.plan_arrays.production.sum(axis=-1),
+                          self.external_cost_array], axis=1)
+        cost, production, external_cost = (discount_factors(discount_rates) @ flows).T
+        d = pd.DataFrame(index=pd.Index(np.asarray(discount_rates), name="Discount rate"))
+        d["System LCOE"] = cost / production * (MUSD / GWh) / (USD / MWh)
+        d["Total cost"] = cost * MUSD / GUSD
+        d["CO2 cost"] = external_cost * MUSD / GUSD
+        d["Cost with CO2"] = (cost + external_cost) * MUSD / GUSD
+        return d
+
+    @staticmethod
+    def frame(array):
+        """Return the DataFrame of an annual flow by source."""
+        return pd.DataFrame(array, index=years, columns=sources)
+
+    @cached_property
+    def investment(self):
+        return self.frame(self.investment_array)
+
+    @cached_property
+    def salvage_value(self):
+        return self.frame(self.salvage_value_array)
+
+    @cached_property
+    def fixed_OM_cost(self):
+        return self.frame(self.fixed_OM_cost_array)
 
-        def pv(variable):
-            return present_value(variable, parameter.discount_rate).sum()  # Sum on technologies
-
-        self.total_production = pv(plan.production[sources])
-
-        self.investment = (plan.additions * MW
-                           * parameter.construction_cost * USD / kW
-                           / MUSD)
-        self.total_investment = pv(self.investment)
-
-        self.salvage_value = pd.concat([residual_value(plan.additions,
-                                                       parameter.plant_accounting_life,
-                                                       fuel)
-                                        for fuel in sources],
-                                       axis=1)
-        self.total_salvage_value = pv(self.salvage_value)
-
-        self.fixed_OM_cost = (plan.capacities * MW *
-                              parameter.fixed_operating_cost * USD / kW
-                              / MUSD)
-        self.total_fixed_OM_cost = pv(self.fixed_OM_cost)
-
-        self.variable_OM_cost = (plan.production * GWh
-                                 * parameter.variable_operating_cost * USD / MWh
-                                 / MUSD)
-        self.total_variable_OM_cost = pv(self.variable_OM_cost)
-
-        self.heat_used = (plan.production * GWh
-                          * parameter.heat_rate * Btu / kWh
-                          / TBtu)
-        self.fuel_cost = (self.heat_used * TBtu
-                          * parameter.heat_price * USD / MBtu
-                          / MUSD)
-        self.total_fuel_cost = pv(self.fuel_cost)
-
-        self.total_cost = (self.total_investment - self.total_salvage_value
-                           + self.total_fixed_OM_cost + self.total_variable_OM_cost
-                           + self.total_fuel_cost)
-
-        self.lcoe = self.total_cost / self.total_production
-
-        self.emissions = (plan.production * GWh
-                          * parameter.emission_factor * g / kWh
-                          / kt)
-        self.emissions["Total"] = self.emissions.sum(axis=1)
-        self.total_emissions = self.emissions["Total"].sum() * kt / Gt
-
-        self.capture = (plan.production * GWh
-                        * parameter.capture_factor * g / kWh
-                        / kt)
-        self.capture["Total"] = self.capture.sum(axis=1) * kt / Mt
-        self.total_capture = self.capture["Total"].sum() * Mt / Gt
-
-        self.external_cost = (self.emissions["Total"] * kt
-                              * parameter.carbon_price * USD / t
-                              / MUSD)
-        self.total_external_cost = pv(self.external_cost)
-
-        self.signature = '#' + plan.digest + "-" + parameter.digest
+    @cached_property
+    def variable_OM_cost(self):
+        return self.frame(self.variable_OM_cost_array)
+
+    @cached_property
+    def heat_used(self):
+        return self.frame(self.heat_used_array)
+
+    @cached_property
+    def fuel_cost(self):
+        return self.frame(self.fuel_cost_array)
+
+    @cached_property
+    def emissions(self):
+        history = range(end_year + 1 - len(self.emissions_array), end_year + 1)
+        emissions = pd.DataFrame(self.emissions_array, index=history, columns=sources)
+        emissions["Total"] = emissions.sum(axis=1)
+        return emissions
+
+    @cached_property
+    def capture(self):
+        capture = self.frame(self.capture_array)
+        capture["Total"] = capture.sum(axis=1) * kt / Mt
+        return capture
+
+    @cached_property
+    def external_cost(self):
+        return pd.Series(self.external_cost_array, index=years)
 
     def __str__(self):
         return self.signature
@@ -139,20 +389,22 @@ class Run():
 
     def total(self):
         """Dataframe tabulating the key results."""
+        key = self.key_results
+
         def f(cost):
-            return [round(cost * MUSD / GUSD), "bn USD"]
+            return [round(cost), "bn USD"]
         d = pd.DataFrame()
-        d["Power produced"] = [(self.total_production * GWh / TWh).round(), "Twh"]
-        d["System LCOE"] = [round(self.lcoe * (MUSD / GWh) / (USD / MWh), 1), "USD/MWh"]
-        d["Total cost"] = f(self.total_cost)
-        d[" Construction"] = f(self.total_investment)
-        d[" Fuel cost"] = f(self.total_fuel_cost)
-        d[" O&M"] = f(self.total_fixed_OM_cost + self.total_variable_OM_cost)
-        d[" Salvage value"] = f(-self.total_salvage_value)
-        d["CO2 emissions"] = [round(self.total_emissions, 1), "GtCO2eq"]
-        d["CO2 capture"] = [round(self.total_capture, 1), "GtCO2"]
-        d["CO2 cost"] = f(self.total_external_cost)
-        d["Cost with CO2"] = f(self.total_cost + self.total_external_cost)
+        d["Power produced"] = [key.power_produced.round(), "Twh"]
+        d["System LCOE"] = [round(key.system_LCOE, 1), "USD/MWh"]
+        d["Total cost"] = f(key.total_cost)
+        d[" Construction"] = f(key.construction)
+        d[" Fuel cost"] = f(key.fuel_cost)
+        d[" O&M"] = f(key.OM)
+        d[" Salvage value"] = f(key.salvage_value)
+        d["CO2 emissions"] = [round(key.CO2_emissions, 1), "GtCO2eq"]
+        d["CO2 capture"] = [round(key.CO2_capture, 1), "GtCO2"]
+        d["CO2 cost"] = f(key.CO2_cost)
+        d["Cost with CO2"] = f(key.cost_with_CO2)
         d = d.transpose()
         d.columns = [str(self), 'Unit']
         return d
@@ -210,6 +462,60 @@ class Run():
                 )
 
 
+class RunBatch(ArrayRun):
+    """An ensemble of runs of the model, for many parameters and plans, computed together.
+
+    plan is a PowerPlan, or a list of them, or a PlanArrays stacked on leading axes.
+    parameters is a list of Parameter, or a ParameterArrays whose fields are stacked
+    on leading axes. Unstacked fields are common to all the runs.
+    The totals and the LCOE are arrays over the ensemble, of shape plans x parameters.
+    lazy has the same meaning as for Run.
+    """
+
+    totals = ['total_production', 'total_investment', 'total_salvage_value',
+              'total_fixed_OM_cost', 'total_variable_OM_cost', 'total_fuel_cost', 'total_cost',
+              'lcoe', 'total_emissions', 'total_capture', 'total_external_cost']
+
+    def __init__(self, plan, parameters, lazy=False):
+        """Stack the plans and the parameters, then run them as one ArrayRun."""
+        self.plan = plan
+        if isinstance(plan, PowerPlan.PlanArrays):
+            plan_arrays = plan
+        elif isinstance(plan, PowerPlan.PowerPlan):
+            plan_arrays = plan.arrays
+        else:
+            plan_arrays = PowerPlan.stack(plan)
+        plan_shape = plan_arrays.production.shape[:-2]
+        if isinstance(parameters, Parameter.ParameterArrays):
+            parameter_shape = Parameter.batch_shape(parameters)
+        else:
+            parameter_shape = (len(parameters),)
+            parameters = Parameter.stack(parameters)
+        self.parameters = parameters
+        self.shape = plan_shape + parameter_shape
+        # Plans on the outer axes, parameters on the inner axes
+        expand = (Ellipsis,) + (np.newaxis,) * len(parameter_shape) + (slice(None),) * 2
+        super().__init__(PowerPlan.PlanArrays(*[field[expand] for field in plan_arrays]),
+                         parameters, lazy)
+
+    def __len__(self):
+        return int(np.prod(self.shape))
+
+    def total(self):
+        """Dataframe tabulating the key results, one row per run."""
+        return pd.DataFrame({name: np.ravel(getattr(self, name)) for name in self.totals})
+
+
+def breakeven_scale(bau_cost, alt_cost, bau_carbon_cost, alt_carbon_cost):
+    """Multiplier of the carbon price at which both plans have the same cost with CO2.
+
+    The cost with CO2 of a plan is linear in the multiplier s: cost + s * carbon_cost.
+    Arguments broadcast. A negative result means that the plan which emits less is
+    also cheaper without a carbon price.
+    """
+    return (alt_cost - bau_cost) / (bau_carbon_cost - alt_carbon_cost)
+
+
 class RunPair():
     """Compare two power development plans, for the same technico-economic parameters."""
 
@@ -223,16 +529,86 @@ class RunPair():
         s += "ALT = " + str(self.ALT.plan)
         return s
 
+    @cached_property
+    def key_results(self):
+        """Return the KeyResults of BAU, of ALT and of ALT - BAU, unrounded numbers."""
+        bau = self.BAU.key_results
+        alt = self.ALT.key_results
+        return bau, alt, KeyResults(*[a - b for a, b in zip(alt, bau)])
+
+    @cached_property
+    def total_table(self):
+        """Dataframe comparing the key results of the two runs, computed once."""
+        total_BAU = self.BAU.total()
+        total_ALT = self.ALT.total()
+        units = total_BAU.iloc[:, 1]
+        total_BAU = total_BAU.iloc[:, 0]    # Only the values
+        total_ALT = total_ALT.iloc[:, 0]
+        total_diff = total_ALT - total_BAU
+        return pd.concat([total_BAU, total_ALT, total_diff, units], axis=1)
+
     def total(self, headers):
         """Dataframe comparing the key results of the two runs."""
-        units = self.BAU.total().iloc[:, 1]
-        total_BAU = self.BAU.total().iloc[:, 0]    # Only the values
-        total_ALT = self.ALT.total().iloc[:, 0]
-        total_diff = total_ALT - total_BAU
-        d = pd.concat([total_BAU, total_ALT, total_diff, units], axis=1)
+        d = self.total_table.copy()
         d.columns = headers + ['Units']
         return d
 
+    def discount_sweep(self, discount_rates):
+        """Dataframe comparing the two runs for each discount rate.
+
+        Columns are the LCOE of BAU and ALT (USD/MWh), the total cost difference ALT - BAU
+        (bn USD) and the present value cost of avoided emissions (USD/tCO2eq).
+        """
+        bau = self.BAU.discount_sweep(discount_rates)
+        alt = self.ALT.discount_sweep(discount_rates)
+        d = pd.DataFrame(index=bau.index)
+        d["BAU LCOE"] = bau["System LCOE"]
+        d["ALT LCOE"] = alt["System LCOE"]
+        d["Cost difference"] = alt["Total cost"] - bau["Total cost"]
+        d["Cost of avoided emissions"] = - d["Cost difference"] / self.key_results[2].CO2_emissions
+        return d
+
+    def breakeven_discount_rates(self, with_carbon=False):
+        """Array of the discount rates at which the two plans cost the same, maybe empty.
+
+        The present value of the cost difference is a polynomial in 1 / (1 + discount rate),
+        the break-even rates are its real roots in ]0, 1], sorted.
+        With with_carbon, the cost includes the CO2 cost.
+        """
+        difference = self.ALT.annual_cost_array - self.BAU.annual_cost_array
+        if with_carbon:
+            difference = (difference
+                          + self.ALT.external_cost_array - self.BAU.external_cost_array)
+        roots = np.roots(difference[::-1])
+        factors = roots.real[np.abs(roots.imag) <= 1e-9 * np.abs(roots)]
+        factors = factors[(factors > 0) & (factors <= 1)]
+        return np.sort(1 / factors - 1)
+
+    def breakeven_carbon_price_scale(self, discount_rates=None):
+        """Multiplier of the carbon price trajectory at which ALT costs the same as BAU with CO2.
+
+        Solved in closed form from the totals of one evaluation of each run.
+        With discount_rates, a Series of the multipliers by discount rate, from discount sweeps.
+        """
+        if discount_rates is None:
+            return breakeven_scale(self.BAU.total_cost, self.ALT.total_cost,
+                                   self.BAU.total_external_cost, self.ALT.total_external_cost)
+        bau = self.BAU.discount_sweep(discount_rates)
+        alt = self.ALT.discount_sweep(discount_rates)
+        scale = breakeven_scale(bau["Total cost"], alt["Total cost"],
+                                bau["CO2 cost"], alt["CO2 cost"])
+        scale.name = "Carbon price scale"
+        return scale
+
+    @staticmethod
+    def breakeven_carbon_price_scales(bau, alt, parameters):
+        """Array of the break-even carbon price multipliers for parameter variants.
+
+        bau and alt are PowerPlan, parameters as for RunBatch. Both plans run in one batch.
+        """
+        batch = RunBatch([bau, alt], parameters, lazy=True)
+        return breakeven_scale(*batch.total_cost, *batch.total_external_cost)
+
     def emission_sum(self, headers):
         """Dataframe comparing total intertemporal CO2 emissions of the two runs, by technology."""
         es_BAU = self.BAU.emission_sum()
@@ -260,15 +636,16 @@ class RunPair():
         table.columns = headers
         return table
 
-    def carbon_value(self, headers):
-        difference = self.total(headers)['difference']
-        return - difference['Total cost'] / difference['CO2 emissions']
+    def carbon_value(self):
+        """Present value cost of avoided emissions (USD/tCO2eq), from the unrounded totals."""
+        difference = self.key_results[2]
+        return - difference.total_cost / difference.CO2_emissions
 
     def summary(self, headers):
         return ("*******************\n\n"
                 + str(self) + '\n\n'
                 + 'Present value cost of avoided emissions: '
-                + str(round(self.carbon_value(headers), 1)) + ' USD/tCO2eq\n\n'
+                + str(round(self.carbon_value(), 1)) + ' USD/tCO2eq\n\n'
                 + str(self.total(headers)) + '\n\n'
                 + 'Emissions by source (ktCO2eq)\n'
                 + str(self.emission_sum(headers)) + '\n\n'
@@ -0,0 +1,42 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""Plot the distributions of large ensembles from pre-aggregated data.
+
+The renderers take histogram bins or quantiles, as given by EnsembleStatistics,
+so that the render time depends on the number of bins or bands, not of samples.
+"""
+
+import numpy as np
+
+
+def plot_histogram(ax, edges, counts, **kwargs):
+    """Plot counts in bins as adjacent bars."""
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align='edge', **kwargs)
+
+
+def plot_ecdf(ax, values, probabilities, **kwargs):
+    """Plot a cumulative distribution given by its quantiles: values at probabilities."""
+    ax.plot(values, probabilities, **kwargs)
+    ax.set_ylim([0, 1])
+    ax.set_ylabel('Cumulative probability')
+
+
+def plot_fan(ax, x, probabilities, quantiles, color='C0', label=None):
+    """Plot a fan chart: bands between symmetric quantiles, darker inwards, and the median.
+
+    quantiles is an array (probability, x) for increasing probabilities, such as
+    (0.05, 0.25, 0.5, 0.75, 0.95).
+    """
+    n_bands = len(probabilities) // 2
+    for i in range(n_bands):
+        band = "{:.0%} - {:.0%}".format(probabilities[i], probabilities[-1 - i])
+        ax.fill_between(x, quantiles[i], quantiles[-1 - i], color=color, linewidth=0,
+                        alpha=0.25 + 0.5 * i / max(n_bands, 1),
+                        label=band if label is None else label + " " + band)
+    if len(probabilities) % 2:
+        ax.plot(x, quantiles[n_bands], color=color, linewidth=1.5,
+                label="Median" if label is None else label + " median")
@@ -12,29 +12,45 @@ import sys
 import numpy as np
 import matplotlib.pyplot as plt
 
-from prices_data_international import price_coal, price_gas, coal, gas, international_prices_path
+from prices_data_international import price_coal, price_gas, coal, gas, price_paths, commodities
 from prices_data_local import local_prices
-from init import MBtu
+from distribution_plots import plot_fan
+from EnsembleStatistics import EnsembleStatistics
+from init import MBtu, start_year, end_year
 
+fan_probabilities = (0.05, 0.25, 0.5, 0.75, 0.95)
 
-def plot_average_prices(name, source, ax, num_forecasts):
-    """Plot local prices and first international prices trajectories used in the model"""
-    np.random.seed(0)
+
+def forecast_quantiles(num_forecasts, chunk_size=1000):
+    """Return the quantiles of num_forecasts international prices forecasts.
+
+    The forecasts are drawn in chunks and summarized by EnsembleStatistics in bounded memory.
+    The result is an array (probability, year, commodity) with Coal, Gas on the last axis.
+    """
+    random_state = np.random.RandomState(0)
+    statistics = EnsembleStatistics(shape=(end_year - start_year + 1, len(commodities)),
+                                    probabilities=fan_probabilities)
+    for start in range(0, num_forecasts, chunk_size):
+        statistics.update(price_paths(min(chunk_size, num_forecasts - start), price_gas,
+                                      price_coal, random_state))
+    return statistics.quantiles.quantiles()
+
+
+def plot_average_prices(name, source, ax, quantiles):
+    """Plot local prices and the fan chart of the international prices forecasts.
+
+    The forecasts are summarized by their quantiles, the plot does not depend on their number.
+    """
     ax.plot(np.arange(2017-len(source), 2017), source, linewidth=2.0, color='r',
              label='International past prices')
     ax.plot(np.arange(2016, 2050), local_prices[name].loc[2017:2050]* MBtu,
              linewidth=2.0, color='b', label='Local prices (Khanh N., 2017)')
-    international_prices = international_prices_path(price_gas, price_coal)\
-    .international_prices[name]
-    ax.plot(np.arange(2015, 2050), international_prices * MBtu, color='grey',\
-            label='International prices forcasts', linewidth=1.0)
+    plot_fan(ax, np.arange(start_year, end_year + 1), fan_probabilities,
+             quantiles[:, :, commodities.index(name)] * MBtu, color='grey',
+             label='International prices forecasts')
     ax.set_xlabel("Year")
     ax.set_ylabel("2010 USD / MBtu")
     ax.legend(loc='upper left')
-    for _ in range(num_forecasts):
-        international_prices = international_prices_path(price_gas, price_coal)\
-        .international_prices[name]
-        ax.plot(np.arange(2015, 2050), international_prices * MBtu, linewidth=1.0)
     ax.set_title("Evolution of " + name + " prices, 1970 - 2050")
 
 fig, axarr = plt.subplots(2, 1, figsize=[8, 12])
@@ -43,8 +59,9 @@ fig.suptitle("Coal and Gas prices forecasts", fontsize=15)
 coal = [i*MBtu for i in coal]
 gas = [i*MBtu for i in gas]
 
-plot_average_prices("Coal", coal, axarr[0], 10)
-plot_average_prices("Gas", gas, axarr[1], 10)
+forecasts = forecast_quantiles(10000)
+plot_average_prices("Coal", coal, axarr[0], forecasts)
+plot_average_prices("Gas", gas, axarr[1], forecasts)
 
 if __name__ == '__main__':
     if (len(sys.argv) == 3) and (sys.argv[1] == "plot"):
@@ -35,6 +35,8 @@ To clarify column names.
 """
 
 from functools import lru_cache
+import hashlib
+import os
 
 # import time
 import pandas as pd
@@ -49,6 +51,43 @@ VERBOSE = False
 
 show = print if VERBOSE else lambda *a, **k: None
 
+# Directory where Run results are cached between invocations, no cache if empty.
+# Off by default: reading an entry back takes longer than a Run.
+CACHE_DIR = os.environ.get("RUN_CACHE_DIR", "")
+CACHE_MAX_BYTES = 100 * 2**20
+
+# %% Content digests
+
+
+def feed(hasher, item):
+    """Update hasher with the content of item: a number, string, array, Index, Series, DataFrame.
+
+    Arrays are hashed from their raw buffer, dtype and shape, pandas objects also by their labels.
+    """
+    if isinstance(item, (pd.Series, pd.DataFrame)):
+        hasher.update(type(item).__name__.encode('utf-8'))
+        feed(hasher, item.index)
+        feed(hasher, item.columns if isinstance(item, pd.DataFrame) else item.name)
+        feed(hasher, item.to_numpy())
+    elif isinstance(item, pd.Index):
+        feed(hasher, item.to_numpy())
+    elif isinstance(item, np.ndarray) and not item.dtype.hasobject:
+        hasher.update(repr((item.dtype.str, item.shape)).encode('utf-8'))
+        hasher.update(np.ascontiguousarray(item).data)
+    elif isinstance(item, np.ndarray):
+        feed(hasher, item.tolist())
+    else:
+        hasher.update(repr(item).encode('utf-8'))
+
+
+def content_hash(*items):
+    """Return the hexadecimal hash of the content of the items, see feed."""
+    hasher = hashlib.blake2b(digest_size=16)
+    for item in items:
+        feed(hasher, item)
+    return hasher.hexdigest()
+
+
 # %% Rows
 
 start_year = 2016
@@ -64,6 +103,12 @@ def discountor(discount_rate):
                      index=years)
 
 
+def discount_factors(discount_rate):
+    """Array version of discountor, the years on the last axis. Broadcasts on arrays of rates."""
+    base = 1 / (1 + np.asarray(discount_rate, dtype=np.float64))
+    return np.power(base[..., np.newaxis], np.arange(n_year, dtype=np.float64))
+
+
 def present_value(series, discount_rate):
     """Intertemporal total present value. Applies to a series or a dataframe's columns."""
     return series.mul(discountor(discount_rate), axis=0).sum()
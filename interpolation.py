@@ -0,0 +1,81 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""Interpolate yearly series between the years of a plan, for all the series in one call.
+
+The values y are given at the years x, on the last axis of y. The leading axes of y hold as
+many series as needed, for example Coal and Gas, or the samples of a Monte Carlo study.
+
+Interpolation methods:
+ - linear    straight lines between the known years,
+ - pchip     monotone cubic Hermite, no overshoot between the known years,
+ - lagrange  the polynomial through all the known years, in Lagrange basis form, which avoids
+             the ill-conditioned powers of the years of scipy.interpolate.lagrange.
+
+Extrapolation policies, outside the known years:
+ - hold      the value at the nearest known year,
+ - linear    the slope of the nearest interval,
+ - extend    the interpolating function itself,
+ - nan       no value.
+"""
+
+import numpy as np
+from scipy.interpolate import PchipInterpolator
+
+methods = ["linear", "pchip", "lagrange"]
+extrapolations = ["hold", "linear", "extend", "nan"]
+
+
+def lagrange_basis(x, x_new):
+    """Array (known year, new year) of the Lagrange basis polynomials at x_new."""
+    differences = x_new[np.newaxis, :] - x[:, np.newaxis]
+    basis = np.ones((len(x), len(x_new)))
+    for j in range(len(x)):
+        for m in range(len(x)):
+            if m != j:
+                basis[j] *= differences[m] / (x[j] - x[m])
+    return basis
+
+
+def evaluate(x, y, x_new, method):
+    """Values of the interpolating function of the method at x_new, on the last axis."""
+    if method == "linear":
+        i = np.clip(np.searchsorted(x, x_new, side='right') - 1, 0, len(x) - 2)
+        weight = (x_new - x[i]) / (x[i + 1] - x[i])
+        return y[..., i] * (1 - weight) + y[..., i + 1] * weight
+    if method == "pchip":
+        return PchipInterpolator(x, y, axis=-1, extrapolate=True)(x_new)
+    if method == "lagrange":
+        return y @ lagrange_basis(x, x_new)
+    raise ValueError("Unknown interpolation method " + str(method) + ", use one of " +
+                     str(methods))
+
+
+def interpolate(x, y, x_new, method="linear", extrapolation="hold"):
+    """Values at x_new of the series y known at the increasing years x, in one vectorized call.
+
+    y has the years x on its last axis, the result has the years x_new on its last axis.
+    """
+    if extrapolation not in extrapolations:
+        raise ValueError("Unknown extrapolation policy " + str(extrapolation) +
+                         ", use one of " + str(extrapolations))
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    x_new = np.asarray(x_new, dtype=np.float64)
+    if extrapolation == "extend":
+        return evaluate(x, y, x_new, method)
+    inside = np.clip(x_new, x[0], x[-1])
+    values = evaluate(x, y, inside, method)
+    before = x_new < x[0]
+    after = x_new > x[-1]
+    if extrapolation == "linear":
+        slope_before = (y[..., 1:2] - y[..., :1]) / (x[1] - x[0])
+        slope_after = (y[..., -1:] - y[..., -2:-1]) / (x[-1] - x[-2])
+        values = (values + np.where(before, slope_before * (x_new - x[0]), 0)
+                  + np.where(after, slope_after * (x_new - x[-1]), 0))
+    elif extrapolation == "nan":
+        values = np.where(before | after, np.nan, values)
+    return values
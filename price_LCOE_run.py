@@ -8,54 +8,314 @@ Multiple Run to calculate LCOE for different international prices trajectories
 """
 
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from itertools import repeat
+
 import numpy as  np
 import matplotlib.pyplot as plt
 
 from plan_baseline import baseline
 from plan_baseline_2 import alternative
-from price_fuel import Fuel_Price
-from prices_data_international import price_gas, price_coal
+from price_fuel import Fuel_Price, fuel_supply
+from prices_data_international import price_gas, price_coal, fitted_price_model, price_shocks,\
+    international_prices_path, commodities, past_prices, international_past_sources,\
+    default_source
 from prices_data_local import local_prices
 from production_data_local import local_production
 
 
-from Run import Run
+from init import pd, sources, years, n_year, USD, MWh, kWh, content_hash
+from Checkpoint import Checkpoint
+from EnsembleStatistics import EnsembleStatistics
+from distribution_plots import plot_histogram, plot_ecdf
+from Run import Run, RunBatch, KeyResults, code_digest
+
+US_cent_per_kWh = 0.01 * USD / kWh
+
+# The code and data of the ensembles, besides those of the model runs
+ENSEMBLE_SOURCES = (['price_LCOE_run.py', 'price_fuel.py', 'prices_data_international.py',
+                     'prices_data_local.py', 'production_data_local.py', 'interpolation.py',
+                     'EnsembleStatistics.py', 'data/Oil_Gas_prices/data_prices_local.csv',
+                     'data/Oil_Gas_prices/data_production_local.csv'] +
+                    [past_data["path_data"] for past_data in international_past_sources.values()])
+ensemble_version = content_hash(Run.code_version, code_digest(ENSEMBLE_SOURCES))
+
+# The published tables and figures keep the original draws
+report_sampling = "legacy"
+
+
+def chunk_prices(seeds, sampling="random", root_seed=0, price_model="gbm",
+                 price_source=default_source):
+    """Return the international prices forecasts of the samples numbered by seeds.
+
+    The result is an array of shape (sample, year, 2) with Coal, Gas on the last axis.
+    price_model is one of the names of price_models, by default the geometric brownian movement,
+    calibrated on the past data of price_source, one of international_past_sources.
+    The samplings draw the price shocks of the chunk with price_shocks. With the default random
+    sampling, sample i reads its own block of the random stream keyed on root_seed: the shocks
+    of different samples and of different root seeds are independent.
+    The legacy sampling reproduces the original draws: each sample seeds the global random
+    generator with its number root_seed + i, and the gbm forecasts are those of
+    international_prices_path. Ensembles with root seeds 0 and 1 then share all their samples
+    but one, a new root seed does not give a new ensemble.
+    Either way, a sample does not depend on which process computes it.
+    """
+    past_gas, past_coal = past_prices(price_source)
+    model = fitted_price_model(past_gas, past_coal, price_model)
+    if sampling == "legacy":
+        prices = []
+        for seed in seeds:
+            np.random.seed(seed)
+            if price_model == "gbm":
+                prices.append(international_prices_path(past_gas, past_coal)
+                              .international_prices[commodities].to_numpy())
+            else:
+                prices.append(model.price_paths(1, np.random)[0])
+        return np.array(prices)
+    shocks = price_shocks(len(seeds), sampling, root_seed, seeds[0] - root_seed, model.shock_shape)
+    return model.paths(shocks)
+
+
+def ensemble_chunk(scenario, seeds, sampling="random", root_seed=0, price_model="gbm",
+                   price_source=default_source):
+    """Return the LCOE in US cent / kWh, and the costs by year and source in M$, of the scenario.
+
+    The prices forecasts are those of the samples numbered by seeds.
+    As in one_parameter, the average fuel prices follow from the baseline imports.
+    """
+    prices = chunk_prices(seeds, sampling, root_seed, price_model, price_source)
+    parameters = fuel_supply(baseline).parameters(prices)
+    batch = RunBatch(scenario, parameters, lazy=True)
+    return batch.lcoe * 100, np.broadcast_to(batch.cost_array, batch.shape + (n_year, len(sources)))
+
+
+def paired_chunk(plans, seeds, sampling="random", root_seed=0, price_model="gbm",
+                 price_source=default_source):
+    """Return the KeyResults of each plan, arrays over the samples numbered by seeds.
+
+    The plans are evaluated on the same prices forecasts, drawn once. As in ensemble_chunk,
+    the average fuel prices follow from the baseline imports, and are the same for all plans.
+    """
+    prices = chunk_prices(seeds, sampling, root_seed, price_model, price_source)
+    parameters = fuel_supply(baseline).parameters(prices)
+    return [RunBatch(plan, parameters, lazy=True).key_results for plan in plans]
+
+
+def sources_chunk(scenario, seeds, sampling="random", root_seed=0, price_model="gbm",
+                  price_sources=tuple(international_past_sources)):
+    """Return the LCOE in US cent / kWh of the scenario for the samples numbered by seeds.
+
+    The result is an array of shape (sample, source) for the models calibrated on each of the
+    price_sources. A sample uses the same random numbers for all the sources. The prices
+    forecasts of all the sources go through the fuel supply and the plan arrays of one
+    RunBatch, computed once.
+    """
+    prices = np.stack([chunk_prices(seeds, sampling, root_seed, price_model, source)
+                       for source in price_sources], axis=1)
+    batch = RunBatch(scenario, fuel_supply(baseline).parameters(prices), lazy=True)
+    return batch.lcoe * 100
+
+
+def ensemble_chunks(evaluate, plans, seeds, chunk_size, sampling="random", root_seed=0,
+                    workers=1, price_model="gbm", price_source=default_source):
+    """Iterate over evaluate(plans, chunk, ...) for the chunks of seeds, in order.
+
+    evaluate also takes sampling, root_seed, price_model and price_source. With workers > 1,
+    the chunks are evaluated in a process pool.
+    """
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    arguments = (repeat(plans), chunks, repeat(sampling), repeat(root_seed), repeat(price_model),
+                 repeat(price_source))
+    if workers == 1:
+        yield from map(evaluate, *arguments)
+    else:
+        pool = ProcessPoolExecutor(workers)
+        try:
+            yield from pool.map(evaluate, *arguments)
+        finally:
+            # When the iteration stops early, the pending chunks are not computed
+            pool.shutdown(cancel_futures=True)
+
+
+def run_ensemble(ensemble, evaluate, statistics):
+    """Feed the results of the chunks of an ensemble to its statistics, and return them.
+
+    ensemble is a multiple_LCOE or a paired_LCOE: evaluate is applied to its plans, its
+    add_chunk method updates the statistics with the results of a chunk, its converged method
+    tells when to stop early. If ensemble.checkpoint names a file, the run starts from the
+    chunks done and the statistics saved there. They are saved every checkpoint_seconds and
+    at the end. A checkpoint saved by another version of the code or data is refused.
+    """
+    done = 0
+    checkpoint = None
+    if ensemble.checkpoint is not None:
+        plans = ensemble.plans if isinstance(ensemble.plans, list) else [ensemble.plans]
+        key = content_hash(ensemble_version, type(ensemble).__name__,
+                           *[plan.fingerprint for plan in plans],
+                           ensemble.number_run, ensemble.root_seed, ensemble.chunk_size,
+                           ensemble.sampling, ensemble.tolerance, ensemble.probabilities,
+                           ensemble.price_model, ensemble.price_source)
+        checkpoint = Checkpoint(ensemble.checkpoint, key)
+        done, state = checkpoint.load()
+        if state is not None:
+            statistics = state
+            if ensemble.converged(statistics):
+                return statistics
+    seeds = range(ensemble.root_seed + done * ensemble.chunk_size,
+                  ensemble.root_seed + ensemble.number_run)
+    saved = time.time()
+    for chunk in ensemble_chunks(evaluate, ensemble.plans, seeds, ensemble.chunk_size,
+                                 ensemble.sampling, ensemble.root_seed, ensemble.workers,
+                                 ensemble.price_model, ensemble.price_source):
+        ensemble.add_chunk(statistics, chunk)
+        done += 1
+        if ensemble.converged(statistics):
+            break
+        if checkpoint is not None and time.time() - saved >= ensemble.checkpoint_seconds:
+            checkpoint.save(done, statistics)
+            saved = time.time()
+    if checkpoint is not None:
+        checkpoint.save(done, statistics)
+    return statistics
+
+
+def within_tolerance(statistics, tolerance, probabilities):
+    """Tell if the 95% confidence intervals are narrower than +- tolerance.
+
+    The intervals are those on the mean and on the quantiles at probabilities. Always False
+    when tolerance is None.
+    """
+    if tolerance is None or statistics.count < 2:
+        return False
+    half_widths = [statistics.mean_interval()] + [
+        statistics.quantile_interval(p) for p in probabilities]
+    return np.max(half_widths) < tolerance
+
 
 class multiple_LCOE():
     """
     Multiple runs of the model for different international coal and gas prices parameters.
     Compare LCOE of eache run, one to another
+
+    Sample i draws its prices from its own block of the random stream keyed on root_seed, see
+    chunk_prices. With workers > 1, the samples are spread in chunks across a process pool,
+    the results are identical to the serial run.
+    The summary and the plot share one pass over the ensemble, which is not kept in memory.
+
+    With a tolerance, number_run is a budget: sampling stops after the first chunk where the
+    95% confidence intervals on the mean LCOE and on its percentiles given in probabilities
+    are narrower than +- tolerance (US cent / kWh). samples_used tells how many were drawn.
+
+    sampling is one of the sampling_strategies of price_shocks: "random", "antithetic",
+    "latin_hypercube", "sobol", or "legacy" to reproduce the original international_prices_path
+    draws seeded by root_seed + i.
+    Latin hypercubes and antithetic pairs are drawn within each chunk.
+    price_model is one of the names of price_models: "gbm", "bootstrap" for the block bootstrap
+    of past returns, "ou" for mean reverting log prices, "regime_switching", "correlated_gbm".
+    It is calibrated on the past prices of price_source: "WB", "BP" or "EIA".
+
+    checkpoint is a file name where the progress is saved every checkpoint_seconds. A run
+    interrupted for any reason resumes from there, with the same results.
     """
 
-    def __init__(self, scenario, number_run):
+    chunk_size = 100
+    checkpoint_seconds = 60
+    lcoe_edges = np.linspace(0, 10.5, 106)
+    ecdf_probabilities = np.linspace(0, 1, 201)
+
+    def __init__(self, scenario, number_run, root_seed=0, workers=1, tolerance=None,
+                 probabilities=(0.95,), sampling="random", checkpoint=None, price_model="gbm",
+                 price_source=default_source):
+        """Set up the ensemble, the runs are done when the statistics are first asked for."""
         self.scenario = scenario
         self.number_run = number_run
+        self.root_seed = root_seed
+        self.workers = workers
+        self.tolerance = tolerance
+        self.probabilities = probabilities
+        self.sampling = sampling
+        self.checkpoint = checkpoint
+        self.price_model = price_model
+        self.price_source = price_source
+
+    @property
+    def plans(self):
+        return self.scenario
+
+    @staticmethod
+    def one_parameter(international_prices=None, price_model="gbm", price_source=default_source):
+        """Generate parameters with a new international prices forecast, or the one given."""
+        past_gas, past_coal = past_prices(price_source)
+        return Fuel_Price(local_prices, past_gas, past_coal, local_production,
+                          baseline, international_prices, price_model).parameters
 
     def one_run(self):
-        """Generate parameters and run the model with these newly defined parameters"""
-        reference = \
-        Fuel_Price(local_prices, price_gas, price_coal, local_production, baseline).parameters
-        run_model = Run(self.scenario, reference)
+        """Generate parameters and run the model with these newly defined parameters."""
+        run_model = Run(self.scenario, self.one_parameter(price_model=self.price_model,
+                                                          price_source=self.price_source),
+                        lazy=True)
         return run_model.lcoe
 
+    def chunks(self, number_run=None):
+        """Iterate over the results of the chunks of the first number_run samples, in order.
+
+        By default, all the samples.
+        """
+        number_run = self.number_run if number_run is None else number_run
+        seeds = range(self.root_seed, self.root_seed + number_run)
+        return ensemble_chunks(ensemble_chunk, self.scenario, seeds, self.chunk_size,
+                               self.sampling, self.root_seed, self.workers, self.price_model,
+                               self.price_source)
+
     def multiple_run(self):
-        """Initiate the random factor
-        Store lcoe price generated for each run of the model in a sorted list"""
-        lcoe_list = []
-        for i in range(self.number_run):
-            np.random.seed(i)
-            lcoe_list.append(self.one_run()*100)
+        """Store lcoe price generated for each run of the model in a sorted list.
+
+        With a tolerance, these are the samples_used samples of the early stopped ensemble.
+        """
+        number_run = self.number_run if self.tolerance is None else self.samples_used
+        lcoe_list = list(np.concatenate([lcoe for lcoe, _ in self.chunks(number_run)]))
         lcoe_list.sort(reverse=True)
         return lcoe_list
 
+    @cached_property
+    def statistics(self):
+        """Return the statistics of the LCOE and of the costs by year and source, in one pass."""
+        lcoe_statistics = EnsembleStatistics(edges=self.lcoe_edges)
+        cost_statistics = EnsembleStatistics(shape=(n_year, len(sources)), capacity=200)
+        return run_ensemble(self, ensemble_chunk, (lcoe_statistics, cost_statistics))
+
+    @staticmethod
+    def add_chunk(statistics, chunk):
+        for chunk_statistics, results in zip(statistics, chunk):
+            chunk_statistics.update(results)
+
+    def converged(self, statistics):
+        """Tell if a tolerance is given and the confidence intervals on the LCOE are within it."""
+        return within_tolerance(statistics[0], self.tolerance, self.probabilities)
+
+    @property
+    def samples_used(self):
+        """Return the number of samples drawn, at most number_run."""
+        return self.statistics[0].count
+
+    def cost_quantile(self, probability):
+        """Return the quantile of the costs by year and source (M$).
+
+        probability is one of 0.05, 0.5, 0.95.
+        """
+        return pd.DataFrame(self.statistics[1].quantile(probability), index=years,
+                            columns=sources)
+
     def summary(self):
-        """Summary of LCOE prices"""
-        lcoe_values = self.multiple_run()
-        mean_value = np.mean(lcoe_values)
-        median_value = np.median(lcoe_values)
-        perc_value = np.percentile(lcoe_values, 95)
+        """Summary of LCOE prices."""
+        lcoe_statistics = self.statistics[0]
+        mean_value = lcoe_statistics.mean
+        median_value = lcoe_statistics.quantile(0.5)
+        perc_value = lcoe_statistics.quantile(0.95)
         return ("\n LCOE for " +
-                str(self.number_run) +
+                str(self.samples_used) +
                 " gas and coal international prices forecasts in " +
                 str(self.scenario) + " scenario \n\n" +
                 " Mean value : " + str(round(mean_value, 2)) + "\n" +
@@ -67,26 +327,211 @@ class multiple_LCOE():
         print(self.summary())
 
     def plot(self, filename):
-        """Plot generated LCOE"""
-        lcoe = self.multiple_run()
-        fig = plt.figure()
-        fig.suptitle('LCOE for '+ str(self.number_run) +
+        """Plot the histogram and the cumulative distribution of the generated LCOE.
+
+        Both are drawn from the statistics, whatever the size of the ensemble.
+        """
+        lcoe_statistics = self.statistics[0]
+        histogram = lcoe_statistics.histogram
+        fig, (ax_histogram, ax_ecdf) = plt.subplots(1, 2, figsize=[10, 4.8], sharex=True)
+        fig.suptitle('LCOE for '+ str(self.samples_used) +
                      ' gas and coal international prices forecasts in\n'+ str(self.scenario))
-        ax = fig.add_subplot(111)
-        ax.bar(np.arange(len(lcoe)), lcoe, width=1)
-        ax.set_ylabel('LCOE in US cent / kWh')
-        ax.set_xticks([])
-        ax.set_ylim([0, 10.5])
+        plot_histogram(ax_histogram, histogram.edges, histogram.counts)
+        ax_histogram.set_xlabel('LCOE in US cent / kWh')
+        ax_histogram.set_ylabel('Number of runs')
+        plot_ecdf(ax_ecdf, lcoe_statistics.quantiles.quantiles(self.ecdf_probabilities),
+                  self.ecdf_probabilities)
+        ax_ecdf.set_xlabel('LCOE in US cent / kWh')
         fig.savefig(filename)
 
+
+class paired_LCOE():
+    """Paired runs of two plans, on the same international coal and gas prices forecasts.
+
+    With these common random numbers, the differences between the plans vary much less than
+    between two independent ensembles, and the prices forecasts are drawn only once.
+
+    The arguments are as for multiple_LCOE, the tolerance applies to the LCOE difference.
+    Both plans pay the fuel prices of the baseline imports, as in multiple_LCOE, so the LCOE of
+    each plan is that of its own multiple_LCOE ensemble.
+    The carbon value is the cost of avoided emissions of ALT compared to BAU, as in RunPair.
+    """
+
+    chunk_size = 100
+    checkpoint_seconds = 60
+    results = ["BAU LCOE", "ALT LCOE", "LCOE difference", "Cost difference", "Carbon value"]
+    units = ["US cent / kWh", "US cent / kWh", "US cent / kWh", "bn USD", "USD/tCO2eq"]
+
+    def __init__(self, bau, alt, number_run, root_seed=0, workers=1, tolerance=None,
+                 probabilities=(0.95,), sampling="random", checkpoint=None, price_model="gbm",
+                 price_source=default_source):
+        """Set up the ensemble, the runs are done when the statistics are first asked for."""
+        self.bau = bau
+        self.alt = alt
+        self.number_run = number_run
+        self.root_seed = root_seed
+        self.workers = workers
+        self.tolerance = tolerance
+        self.probabilities = probabilities
+        self.sampling = sampling
+        self.checkpoint = checkpoint
+        self.price_model = price_model
+        self.price_source = price_source
+
+    @property
+    def plans(self):
+        return [self.bau, self.alt]
+
+    @cached_property
+    def statistics(self):
+        """Return the dict of the EnsembleStatistics of the results, computed in one pass."""
+        statistics = {name: EnsembleStatistics() for name in self.results}
+        return run_ensemble(self, paired_chunk, statistics)
+
+    def add_chunk(self, statistics, chunk):
+        bau, alt = chunk
+        difference = KeyResults(*[a - b for a, b in zip(alt, bau)])
+        samples = [bau.system_LCOE * USD / MWh / US_cent_per_kWh,
+                   alt.system_LCOE * USD / MWh / US_cent_per_kWh,
+                   difference.system_LCOE * USD / MWh / US_cent_per_kWh,
+                   difference.total_cost,
+                   - difference.total_cost / difference.CO2_emissions]
+        for name, sample in zip(self.results, samples):
+            statistics[name].update(sample)
+
+    def converged(self, statistics):
+        """Tell if a tolerance is given and the intervals on the LCOE difference are within it."""
+        return within_tolerance(statistics["LCOE difference"], self.tolerance, self.probabilities)
+
+    @property
+    def samples_used(self):
+        """Return the number of samples drawn, at most number_run."""
+        return self.statistics["LCOE difference"].count
+
+    def standard_errors(self):
+        """Return the standard errors of the mean LCOE difference, paired and independent."""
+        statistics = self.statistics
+        paired = statistics["LCOE difference"].std / np.sqrt(self.samples_used)
+        independent = np.sqrt((statistics["BAU LCOE"].std ** 2 + statistics["ALT LCOE"].std ** 2)
+                              / self.samples_used)
+        return paired, independent
+
+    def table(self):
+        """Return a Dataframe of the mean and quantiles of the results."""
+        d = pd.DataFrame(index=self.results)
+        d["Mean"] = [self.statistics[name].mean for name in self.results]
+        for probability, column in [(0.05, "5%"), (0.5, "Median"), (0.95, "95%")]:
+            d[column] = [self.statistics[name].quantile(probability) for name in self.results]
+        d["Units"] = self.units
+        return d
+
+    def summary(self):
+        """Summary of the paired differences."""
+        paired, independent = self.standard_errors()
+        return ("\n Paired runs for " + str(self.samples_used) +
+                " gas and coal international prices forecasts\n" +
+                " BAU = " + str(self.bau) + "\n" +
+                " ALT = " + str(self.alt) + "\n\n" +
+                str(self.table().round(2)) + "\n\n" +
+                " Standard error of the mean LCOE difference: " + str(round(paired, 4)) +
+                " paired, " + str(round(independent, 4)) + " with independent ensembles\n")
+
+    def summarize(self):
+        """Print object's summary."""
+        print(self.summary())
+
+
+class sources_LCOE():
+    """Multiple runs of a plan with the prices models calibrated on each source of past data.
+
+    All the sources are in one ensemble. Sample i uses the same random numbers for all the
+    sources, so the sources differ only by their calibration. Each chunk of samples evaluates
+    the prices forecasts of all the sources in one RunBatch, which computes the fuel supply
+    and plan arrays once for all of them.
+    The other arguments are as for multiple_LCOE, the tolerance applies to every source.
+    """
+
+    chunk_size = 100
+    checkpoint_seconds = 60
+
+    def __init__(self, scenario, number_run, price_sources=tuple(international_past_sources),
+                 root_seed=0, workers=1, tolerance=None, probabilities=(0.95,),
+                 sampling="random", checkpoint=None, price_model="gbm"):
+        """Set up the ensemble, the runs are done when the statistics are first asked for."""
+        self.scenario = scenario
+        self.number_run = number_run
+        self.price_source = tuple(price_sources)
+        self.root_seed = root_seed
+        self.workers = workers
+        self.tolerance = tolerance
+        self.probabilities = probabilities
+        self.sampling = sampling
+        self.checkpoint = checkpoint
+        self.price_model = price_model
+
+    @property
+    def plans(self):
+        return self.scenario
+
+    @cached_property
+    def statistics(self):
+        """Return the statistics of the LCOE of each source, in one pass."""
+        statistics = EnsembleStatistics(shape=(len(self.price_source),))
+        return run_ensemble(self, sources_chunk, statistics)
+
+    @staticmethod
+    def add_chunk(statistics, chunk):
+        statistics.update(chunk)
+
+    def converged(self, statistics):
+        """Tell if a tolerance is given and the LCOE intervals of all sources are within it."""
+        return within_tolerance(statistics, self.tolerance, self.probabilities)
+
+    @property
+    def samples_used(self):
+        """Return the number of samples drawn, at most number_run."""
+        return self.statistics.count
+
+    def table(self):
+        """Return a Dataframe of the mean and quantiles of the LCOE in US cent / kWh, by source."""
+        d = pd.DataFrame(index=pd.Index(self.price_source, name="Prices data"))
+        d["Mean"] = self.statistics.mean
+        for probability, column in [(0.05, "5%"), (0.5, "Median"), (0.95, "95%")]:
+            d[column] = self.statistics.quantile(probability)
+        return d
+
+    def summary(self):
+        """Summary of LCOE prices by source of past prices data."""
+        return ("\n LCOE for " + str(self.samples_used) +
+                " gas and coal international prices forecasts by source of past data in " +
+                str(self.scenario) + " scenario, US cent / kWh\n\n" +
+                str(self.table().round(2)) + "\n")
+
+    def summarize(self):
+        """Print object's summary."""
+        print(self.summary())
+
+
 if __name__ == '__main__':
     if (len(sys.argv) == 2) and (sys.argv[1] == "summarize"):
-        LCOE_list = multiple_LCOE(baseline, 100)
+        LCOE_list = multiple_LCOE(baseline, 100, sampling=report_sampling)
         LCOE_list.summarize()
-        LCOE_list_alt = multiple_LCOE(alternative, 100)
+        LCOE_list_alt = multiple_LCOE(alternative, 100, sampling=report_sampling)
         LCOE_list_alt.summarize()
 
+    if (len(sys.argv) == 2) and (sys.argv[1] == "paired"):
+        paired_LCOE(baseline, alternative, 100, sampling=report_sampling).summarize()
+
+    if (len(sys.argv) == 3) and (sys.argv[1] == "converge"):
+        for plan in [baseline, alternative]:
+            LCOE_list = multiple_LCOE(plan, 10000, tolerance=float(sys.argv[2]),
+                                      sampling=report_sampling)
+            LCOE_list.summarize()
+
+    if (len(sys.argv) == 2) and (sys.argv[1] == "sources"):
+        sources_LCOE(baseline, 100, sampling=report_sampling).summarize()
+
     if (len(sys.argv) == 3) and (sys.argv[1] == "plot"):
-        LCOE_list = multiple_LCOE(baseline, 100)
+        LCOE_list = multiple_LCOE(baseline, 100, sampling=report_sampling)
         LCOE_list.plot(sys.argv[2])
             
\ No newline at end of file
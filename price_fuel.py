@@ -21,29 +21,50 @@ fixed_operating_cost, variable_operating_cost, heat_rate, heat_price,\
 emission_factor, capture_factor, carbon_price
 
 from prices_data_local import local_prices
-from prices_data_international import international_prices_path, price_coal, price_gas
+from prices_data_international import international_prices_path, price_coal, price_gas,\
+commodities, fitted_price_model, international_prices_frame
 from production_data_local import local_production
 
 from Parameter import Parameter
 
-class Fuel_Price():
-    """An average price for fuels"""
-
-    def __init__(self, loc_prices, past_price_gas, past_price_coal, loc_production,
-               scenario):
-
+reference_parameter = Parameter(discount_rate,
+                                plant_accounting_life,
+                                construction_cost[sources],
+                                fixed_operating_cost[sources],
+                                variable_operating_cost[sources],
+                                heat_rate,
+                                heat_price,
+                                emission_factor,
+                                capture_factor,
+                                carbon_price)
+
+
+class FuelSupply():
+    """The coal and gas supply balance of a scenario: needs, local production and importation.
+
+    It depends only on the scenario, the heat rate and the local production and prices, so it is
+    computed once per scenario. The average prices then follow for whole batches of
+    international prices paths, as arrays of shape (..., year, 2) with Coal, Gas on the last axis.
+    Use fuel_supply to get the supply of a plan with the default local data, computed once.
+    """
+
+    def __init__(self, loc_prices, loc_production, scenario):
+        """Balance the needs of the scenario with the local production, year by year."""
         self.index = list(range(start_year, end_year+1))
         self.loc_prices = loc_prices
-        self.international_prices = \
-        international_prices_path(past_price_gas, past_price_coal).international_prices
         self.loc_production = loc_production
         self.scenario = scenario
 
         #Qualify what importation have to be done (in Btu)
         self.needed_production = self.needed_energy()
         self.needed_importation = self.importation()
-        self.average_price = self.price_calculation()
-        self.parameters = self.generate_parameters()
+
+        def as_array(frame):
+            return frame[commodities].reindex(self.index).to_numpy(dtype=np.float64)
+        self.needed_array = as_array(self.needed_production)
+        self.importation_array = as_array(self.needed_importation)
+        self.loc_production_array = as_array(self.loc_production)
+        self.loc_prices_array = as_array(self.loc_prices)
 
     def needed_energy(self):
         """Get how much energy from gas and coal is needed for the scenario"""
@@ -66,20 +87,107 @@ class Fuel_Price():
         importation[importation < 0] = 0
         return importation
 
+    def average_prices(self, international_prices):
+        """Calculate the average Coal and Gas prices in USD/Btu.
+
+        international_prices is an array (..., year, 2). If there is not any importation,
+        local price is considered.
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.importation_array == 0, self.loc_prices_array,
+                            (self.loc_production_array * self.loc_prices_array +
+                             self.importation_array * international_prices) / self.needed_array)
+
+    def heat_prices(self, international_prices):
+        """Return the stacked heat prices (..., year, source) in USD/MBtu.
+
+        These are the average prices for Coal and Gas, the reference heat prices for the other
+        sources.
+        """
+        average_prices = self.average_prices(international_prices) * MBtu
+        reference_heat_price = reference_parameter.arrays.heat_price
+        heat_prices = np.broadcast_to(reference_heat_price, average_prices.shape[:-2] +
+                                      reference_heat_price.shape).copy()
+        for i, fuel in enumerate(commodities):
+            heat_prices[..., sources.index(fuel)] = average_prices[..., i]
+        return heat_prices
+
+    def parameters(self, international_prices):
+        """Return the ParameterArrays with the stacked heat prices, for a RunBatch.
+
+        The other fields are those of the reference parameters, common to all the runs.
+        """
+        heat_prices = self.heat_prices(international_prices)
+        return reference_parameter.arrays._replace(heat_price=heat_prices)
+
+
+def scaled_parameters(arrays, relative_prices):
+    """Return ParameterArrays with the prices of other commodities scaled by relative paths.
+
+    relative_prices maps a source to an array (..., year) of its prices over the first year
+    price, for example the Oil and Biomass columns of correlated_gbm_model paths divided by
+    their first year. The heat price of that source is scaled, "Carbon" scales the carbon
+    price. The paths of a batch are stacked on the leading axes, as for a RunBatch.
+    """
+    heat_price = arrays.heat_price
+    carbon_price = arrays.carbon_price
+    for name, relative in relative_prices.items():
+        if name == "Carbon":
+            carbon_price = carbon_price * relative
+        else:
+            scale = np.ones(np.shape(relative) + (len(sources),))
+            scale[..., sources.index(name)] = relative
+            heat_price = heat_price * scale
+    return arrays._replace(heat_price=heat_price, carbon_price=carbon_price)
+
+
+supplies = {}
+
+
+def fuel_supply(scenario):
+    """Return the FuelSupply of the scenario with the default local prices and production.
+
+    It is computed once per plan content.
+    """
+    if scenario.fingerprint not in supplies:
+        supplies[scenario.fingerprint] = FuelSupply(local_prices, local_production, scenario)
+    return supplies[scenario.fingerprint]
+
+
+class Fuel_Price():
+    """An average price for fuels
+
+    The international prices forecast is drawn at random, unless given as a Dataframe.
+    It is drawn from price_model, one of the names of price_models, by default the
+    international_prices_path geometric brownian movement
+    """
+
+    def __init__(self, loc_prices, past_price_gas, past_price_coal, loc_production,
+               scenario, international_prices=None, price_model="gbm"):
+
+        self.index = list(range(start_year, end_year+1))
+        self.loc_prices = loc_prices
+        if international_prices is None and price_model == "gbm":
+            international_prices = \
+            international_prices_path(past_price_gas, past_price_coal).international_prices
+        elif international_prices is None:
+            model = fitted_price_model(past_price_gas, past_price_coal, price_model)
+            international_prices = international_prices_frame(model.price_paths(1)[0])
+        self.international_prices = international_prices
+        self.loc_production = loc_production
+        self.scenario = scenario
+
+        self.supply = FuelSupply(loc_prices, loc_production, scenario)
+        self.needed_production = self.supply.needed_production
+        self.needed_importation = self.supply.needed_importation
+        self.average_price = self.price_calculation()
+        self.parameters = self.generate_parameters()
+
     def price_calculation(self):
         """Calculate the average fuel price (for Coal and Gas) in USD/Btu"""
-        #If there is not any importation, local price is considered
-        average_price = pd.DataFrame(columns=['Coal', 'Gas'], index=self.index, dtype=float)
-        average_price['Coal'] = np.where(self.needed_importation['Coal'] == 0,
-                     self.loc_prices['Coal'], (self.loc_production['Coal']*
-                          self.loc_prices['Coal'] + self.needed_importation['Coal'] *
-                          self.international_prices['Coal']) / (self.needed_production['Coal']))
-
-        average_price['Gas'] = np.where(self.needed_importation['Gas'] == 0,
-                     self.loc_prices['Gas'], (self.loc_production['Gas']*
-                          self.loc_prices['Gas'] + self.needed_importation['Gas'] *
-                          self.international_prices['Gas']) / (self.needed_production['Gas']))
-        return average_price
+        international_prices = self.international_prices[commodities].reindex(self.index)
+        return pd.DataFrame(self.supply.average_prices(international_prices.to_numpy(float)),
+                            columns=commodities, index=self.index)
 
     def generate_parameters(self):
         """Generate parameters with different international prices forecasts at each run"""
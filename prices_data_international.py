@@ -7,38 +7,41 @@ Created on Mon Jan  8 11:44:08 2018
 Prices are in $/mt (in 2017 US dollars and metric ton) for Coal based on Australian prices and
 in $/mmbtu for Gas based on Japan prices.
 
-Data has to be choose in the beginning of this script by uncomment the right one
-They are from the World Bank (WB), British Petroleum (BP) or US Energy Information Agency (EIA)
+Data are from the World Bank (WB), British Petroleum (BP) or US Energy Information Agency (EIA).
+All the sources are available at runtime by name with past_prices, the module level price_gas
+and price_coal are those of the default source.
 """
 
+import abc
 import sys
+import warnings
 
 import numpy as np
-from scipy.stats import norm
-from init import pd, start_year, end_year, t, MBtu, calorific_power
+from scipy.special import ndtri
+from scipy.stats import norm, qmc
+from init import pd, start_year, end_year, t, MBtu, calorific_power, content_hash
 
-international_past_data = {}
+international_past_sources = {
+    "WB": {"path_data": "data/Oil_Gas_prices/data_prices_international_past_WB.csv",
+           "ini_year_Gas": 1977,
+           "ini_year_Coal": 1970},
+    "BP": {"path_data": "data/Oil_Gas_prices/data_prices_international_past_BP.csv",
+           "ini_year_Gas": 1977,
+           "ini_year_Coal": 1970},
+    "EIA": {"path_data": "data/Oil_Gas_prices/data_prices_international_past_EIA.csv",
+            "ini_year_Gas": 1970,
+            "ini_year_Coal": 1960}}
 
-# FROM WB
-international_past_data["path_data"] = "data/Oil_Gas_prices/data_prices_international_past_WB.csv"
-international_past_data["ini_year_Gas"] = 1977
-international_past_data["ini_year_Coal"] = 1970
+default_source = "WB"
 
-# FROM BP
-#international_past_data["path_data"] = "data/Oil_Gas_prices/data_prices_international_past_BP.csv"
-#international_past_data["ini_year_Gas"] = 1977
-#international_past_data["ini_year_Coal"] = 1970
-
-# FROM EIA
-#international_past_data["path_data"] = "data/Oil_Gas_prices/data_\
-#prices_international_past_EIA.csv"
-#international_past_data["ini_year_Gas"] = 1970
-#international_past_data["ini_year_Coal"] = 1960
+international_past_data = international_past_sources[default_source]
 
 #%%Monte Carlo characteristics : 35 forcasted prices from 2016 to 2050
 for_values = end_year - start_year +1
 
 
+commodities = ["Coal", "Gas"]
+
 #Collect of data
 international_prices_data = pd.read_csv(international_past_data["path_data"], index_col=0)
 
@@ -48,11 +51,29 @@ x = np.array(international_prices_data.index)
 y_coal = np.array(international_prices_data.Coal) / (calorific_power["Coal_international"] * t)
 y_gas = np.array(international_prices_data.Gas) / MBtu
 
-price_gas = pd.DataFrame({'Price_Gas': international_prices_data['Gas']})\
-            .loc[international_past_data["ini_year_Gas"]:2016] / (MBtu)
-price_coal = pd.DataFrame({'Price_Coal': international_prices_data['Coal']})\
-            .loc[international_past_data["ini_year_Coal"]:2016]\
-/(calorific_power["Coal_international"] * t)
+past_prices_data = {}
+
+def past_prices(source=default_source):
+    """Return the past (gas, coal) prices Dataframes of a data source in $/Btu, read once.
+
+    source is one of the names of international_past_sources.
+    """
+    if source not in international_past_sources:
+        raise ValueError("Unknown prices data source " + str(source) + ", use one of " +
+                         str(list(international_past_sources)))
+    if source not in past_prices_data:
+        past_data = international_past_sources[source]
+        data = pd.read_csv(past_data["path_data"], index_col=0)
+        data.columns = ["Gas", "Coal"]
+        past_gas = pd.DataFrame({'Price_Gas': data['Gas']})\
+            .loc[past_data["ini_year_Gas"]:2016] / (MBtu)
+        past_coal = pd.DataFrame({'Price_Coal': data['Coal']})\
+            .loc[past_data["ini_year_Coal"]:2016]\
+            /(calorific_power["Coal_international"] * t)
+        past_prices_data[source] = past_gas, past_coal
+    return past_prices_data[source]
+
+price_gas, price_coal = past_prices(default_source)
 coal = []
 gas = []
 for j in range(len(price_coal)):
@@ -85,6 +106,458 @@ def log_returns(data):
     stdev = log_ret.std()
     return drift.values[0], stdev.values[0]
 
+def realized_pairwise_correlation(past_gas, past_coal):
+    """Calculate the correlation factor of past gas and coal data, on the years of gas data."""
+    c_coal = [c[0] for c in np.array(past_coal)[len(past_coal) - len(past_gas):]]
+    c_gas = [g[0] for g in np.array(past_gas)]
+    x_gas = x_function(c_gas)
+    x_coal = x_function(c_coal)
+    av_gas = average_coeff(x_gas)
+    av_coal = average_coeff(x_coal)
+    coef_gas = []
+    coef_coal = []
+
+    for i, _ in enumerate(x_gas):
+        coef_gas.append(x_gas[i] - av_gas)
+        coef_coal.append(x_coal[i] - av_coal)
+
+    coef_cor = sum(a * b for (a, b)\
+                   in zip(coef_gas, coef_coal)) / np.sqrt(sum(a * b for (a, b)\
+                              in zip(coef_gas, coef_gas)) * sum(a * b for (a, b) \
+                                    in zip(coef_coal, coef_coal)))
+    return coef_cor
+
+def joint_prices(past_gas, past_coal):
+    """Return the Dataframe of the past prices of the years where both are known, Coal, Gas."""
+    past = pd.concat([past_coal.iloc[:, 0], past_gas.iloc[:, 0]], axis=1, join='inner')
+    past.columns = commodities
+    return past
+
+def joint_log_prices(past_gas, past_coal):
+    """Return the log of the past prices of the years where both are known.
+
+    The result is an array (year, [Coal, Gas]).
+    """
+    return np.log(joint_prices(past_gas, past_coal).to_numpy())
+
+class price_model(abc.ABC):
+    """Interface of the international prices models, see price_models.
+
+    A model is calibrated on past gas and coal prices when created, use fitted_price_model to
+    calibrate it only once. It generates batches of prices paths, arrays of shape
+    (n_paths, years, 2) with Coal, Gas on the last axis, starting at the last historical prices.
+    paths transforms standard normal shocks of shape (n_paths,) + shock_shape into prices paths,
+    so that any sampling strategy of price_shocks can drive any model.
+    """
+
+    shock_shape = (for_values - 1, 2)
+
+    @property
+    def last_prices(self):
+        return np.array([self.last_coal, self.last_gas])
+
+    def price_paths(self, n_paths, random_state=np.random):
+        """Generate n_paths prices paths in one vectorized call, from random_state normal draws."""
+        return self.paths(random_state.standard_normal((n_paths,) + self.shock_shape))
+
+    @abc.abstractmethod
+    def paths(self, shocks):
+        """Return prices paths of shape (n_paths, years, commodities) driven by the shocks."""
+
+    def start_paths(self, n_paths, log_returns):
+        """Return prices paths from the last historical prices and the following log returns."""
+        paths = np.empty((n_paths, for_values, len(self.last_prices)))
+        paths[:, 0] = self.last_prices
+        paths[:, 1:] = paths[:, :1] * np.exp(np.cumsum(log_returns, axis=1))
+        return paths
+
+    def summarize(self):
+        print(self.summary())
+
+class gbm_price_model(price_model):
+    """Geometric brownian movement of coal and gas prices, calibrated once on past data.
+
+    Drift, volatility and correlation of the log returns are computed at creation.
+    Use fitted_price_model to get the model of a data source, calibrated only once.
+    """
+
+    def __init__(self, past_gas, past_coal):
+        """Estimate the drifts, volatilities and correlation of the past log returns."""
+        self.drift_gas, self.stdev_gas = log_returns(past_gas)
+        self.drift_coal, self.stdev_coal = log_returns(past_coal)
+        self.coef_cor = realized_pairwise_correlation(past_gas, past_coal)
+        self.last_gas = past_gas.iloc[-1, 0]
+        self.last_coal = past_coal.iloc[-1, 0]
+
+    def price_paths(self, n_paths, random_state=np.random):
+        """Generate n_paths pairs of correlated prices paths in one vectorized call.
+
+        Direct normal draws from random_state, and a cumulative sum of the log returns.
+        Returns an array of shape (n_paths, years, 2), the last axis is Coal, Gas as in
+        commodities. The first year is the last historical price.
+        """
+        b = random_state.standard_normal((2, n_paths, for_values - 1))
+        return self.paths(np.moveaxis(b, 0, -1))
+
+    def paths(self, shocks):
+        """Generate the prices paths driven by given standard normal shocks.
+
+        shocks has shape (n_paths, years - 1, 2), the last axis holds the gas shock and the part
+        of the coal shock independent from it. See price_shocks for sampling strategies.
+        """
+        log_return_gas = self.drift_gas + self.stdev_gas * shocks[..., 0]
+        log_return_coal = self.drift_coal + self.stdev_coal * (self.coef_cor * shocks[..., 0] +
+                                                               np.sqrt(1 - self.coef_cor**2) *
+                                                               shocks[..., 1])
+        return self.start_paths(len(shocks), np.stack([log_return_coal, log_return_gas], axis=-1))
+
+    def summary(self):
+        return ("Gaz prices\n" +
+                "Drift value : " + str(round(self.drift_gas, 3)) + "\n" +
+                "Standard Deviation : " + str(round(self.stdev_gas, 2))+"\n\n"+
+                "Coal prices\n" +
+                "Drift value : " + str(round(self.drift_coal, 3)) + "\n" +
+                "Standard Deviation : " + str(round(self.stdev_coal, 2)) +
+                "\n\n" +
+                "Correlation factor between the two series: " + str(round(self.coef_cor, 2)) + "\n"
+                )
+
+class block_bootstrap_model(price_model):
+    """Coal and gas prices paths resampled from blocks of past joint log returns.
+
+    The log returns of the years where both series are known are kept side by side, so that
+    a block carries the correlation, the fat tails and the volatility clustering of the past.
+    A path chains blocks of block_length consecutive years, starting at random years and
+    wrapping around the end of the data (circular block bootstrap).
+    """
+
+    def __init__(self, past_gas, past_coal, block_length=5):
+        """Keep the past joint log returns, to be resampled in blocks of block_length years."""
+        self.log_returns = np.diff(joint_log_prices(past_gas, past_coal), axis=0)
+        self.block_length = block_length
+        self.n_blocks = -(-(for_values - 1) // block_length)
+        self.shock_shape = (self.n_blocks,)
+        self.last_coal = past_coal.iloc[-1, 0]
+        self.last_gas = past_gas.iloc[-1, 0]
+
+    def paths(self, shocks):
+        """Generate the prices paths with block starts given by standard normal shocks.
+
+        shocks has shape (n_paths, blocks), see price_shocks for sampling strategies. Their
+        probabilities pick the first years of the blocks uniformly among the past returns.
+        All the paths are built at once by indexing the array of past returns.
+        Returns an array of shape (n_paths, years, 2), the last axis is Coal, Gas.
+        """
+        n_returns = len(self.log_returns)
+        starts = np.minimum((norm.cdf(shocks) * n_returns).astype(int), n_returns - 1)
+        indices = (starts[:, :, np.newaxis] + np.arange(self.block_length)) % n_returns
+        indices = indices.reshape(len(shocks), -1)[:, :for_values - 1]
+        return self.start_paths(len(shocks), self.log_returns[indices])
+
+    def summary(self):
+        mean = self.log_returns.mean(axis=0)
+        stdev = self.log_returns.std(axis=0, ddof=1)
+        return ("Block bootstrap of " + str(len(self.log_returns)) + " past joint log returns, " +
+                "blocks of " + str(self.block_length) + " years\n\n" +
+                "Gaz prices\n" +
+                "Mean log return : " + str(round(mean[1], 3)) + "\n" +
+                "Standard Deviation : " + str(round(stdev[1], 2)) + "\n\n" +
+                "Coal prices\n" +
+                "Mean log return : " + str(round(mean[0], 3)) + "\n" +
+                "Standard Deviation : " + str(round(stdev[0], 2)) + "\n\n" +
+                "Correlation factor between the two series: " +
+                str(round(np.corrcoef(self.log_returns.T)[0, 1], 2)) + "\n")
+
+def ar1_fit(log_prices):
+    """Return intercept, slope and residuals of the least squares fit of x[t+1] = a + b x[t]."""
+    x = np.asarray(log_prices)
+    design = np.column_stack([np.ones(len(x) - 1), x[:-1]])
+    (a, b), _, _, _ = np.linalg.lstsq(design, x[1:], rcond=None)
+    return a, b, x[1:] - design @ [a, b]
+
+class ou_price_model(price_model):
+    """Mean reverting coal and gas log prices, a discrete Ornstein-Uhlenbeck process.
+
+    Each log price follows x[t+1] = a + b x[t] + stdev * e[t], fitted by least squares on its
+    past data. With 0 < b < 1, the prices revert to exp(a / (1 - b)) and their spread stays
+    bounded. The shocks of coal and gas are correlated as the residuals of the common years.
+    """
+
+    def __init__(self, past_gas, past_coal):
+        """Fit the mean reverting recurrence of each log price, and the residuals correlation."""
+        log_gas = np.log(past_gas.iloc[:, 0])
+        log_coal = np.log(past_coal.iloc[:, 0])
+        self.a_gas, self.b_gas, residuals_gas = ar1_fit(log_gas)
+        self.a_coal, self.b_coal, residuals_coal = ar1_fit(log_coal)
+        self.stdev_gas = residuals_gas.std(ddof=2)
+        self.stdev_coal = residuals_coal.std(ddof=2)
+        common = min(len(residuals_gas), len(residuals_coal))
+        self.coef_cor = np.corrcoef(residuals_gas[-common:], residuals_coal[-common:])[0, 1]
+        self.last_gas = past_gas.iloc[-1, 0]
+        self.last_coal = past_coal.iloc[-1, 0]
+
+    def paths(self, shocks):
+        """Generate the prices paths driven by given standard normal shocks.
+
+        shocks has shape (n_paths, years - 1, 2), the gas shock and the part of the coal shock
+        independent from it, as for gbm_price_model. The recurrence runs over the years, for
+        all the paths at once.
+        """
+        e_gas = shocks[..., 0]
+        e_coal = self.coef_cor * shocks[..., 0] + np.sqrt(1 - self.coef_cor**2) * shocks[..., 1]
+        a = np.array([self.a_coal, self.a_gas])
+        b = np.array([self.b_coal, self.b_gas])
+        noise = np.stack([self.stdev_coal * e_coal, self.stdev_gas * e_gas], axis=-1)
+        log_prices = np.empty((len(shocks), for_values, 2))
+        log_prices[:, 0] = np.log([self.last_coal, self.last_gas])
+        for i in range(1, for_values):
+            log_prices[:, i] = a + b * log_prices[:, i - 1] + noise[:, i - 1]
+        return np.exp(log_prices)
+
+    def summary(self):
+        return ("Gaz prices\n" +
+                "Mean reversion factor : " + str(round(self.b_gas, 3)) + "\n" +
+                "Long term price : " + str(round(np.exp(self.a_gas / (1 - self.b_gas)) * MBtu, 2)) +
+                " $/MBtu\n" +
+                "Standard Deviation : " + str(round(self.stdev_gas, 2)) + "\n\n" +
+                "Coal prices\n" +
+                "Mean reversion factor : " + str(round(self.b_coal, 3)) + "\n" +
+                "Long term price : " +
+                str(round(np.exp(self.a_coal / (1 - self.b_coal)) * MBtu, 2)) +
+                " $/MBtu\n" +
+                "Standard Deviation : " + str(round(self.stdev_coal, 2)) + "\n\n" +
+                "Correlation factor between the two series: " + str(round(self.coef_cor, 2)) + "\n")
+
+def gaussian_densities(x, means, covariances):
+    """Return the densities of the points x (time, 2) under the normal laws of each state.
+
+    The result has shape (time, state).
+    """
+    deviations = x[:, np.newaxis] - means
+    inverses = np.linalg.inv(covariances)
+    squares = np.einsum('tsi,sij,tsj->ts', deviations, inverses, deviations)
+    return np.exp(-0.5 * squares) / (2 * np.pi * np.sqrt(np.linalg.det(covariances)))
+
+class regime_switching_model(price_model):
+    """Coal and gas log returns switching between a calm and a turbulent regime.
+
+    The regime is a two states Markov chain. In each regime, the joint log returns are normal
+    with their own means and covariance matrix. The model is calibrated on the past joint log
+    returns by the Baum-Welch algorithm, started from a split of the years by the size of
+    their returns. The forecasts start from the regime probabilities of the last past year.
+    """
+
+    iterations = 200
+    shock_shape = (for_values - 1, 3)
+
+    def __init__(self, past_gas, past_coal):
+        """Calibrate the regimes on the past joint log returns."""
+        returns = np.diff(joint_log_prices(past_gas, past_coal), axis=0)
+        size = np.sum(((returns - returns.mean(axis=0)) / returns.std(axis=0)) ** 2, axis=1)
+        weights = np.column_stack([size <= np.median(size), size > np.median(size)]) * 1.0
+        self.fit_laws(returns, weights)
+        self.transition = np.full((2, 2), 0.5)
+        initial = np.full(2, 0.5)
+        for _ in range(self.iterations):
+            forward, weights, pairs = self.regime_probabilities(returns, initial)
+            self.fit_laws(returns, weights)
+            self.transition = pairs.sum(axis=0) / pairs.sum(axis=(0, 2))[:, np.newaxis]
+            initial = weights[0]
+        self.last_regime = self.regime_probabilities(returns, initial)[0][-1]
+        self.cholesky = np.linalg.cholesky(self.covariances)
+        self.last_coal = past_coal.iloc[-1, 0]
+        self.last_gas = past_gas.iloc[-1, 0]
+
+    def fit_laws(self, returns, weights):
+        """Fit the means and covariances of the returns in each regime, given its probabilities."""
+        total = weights.sum(axis=0)
+        self.means = weights.T @ returns / total[:, np.newaxis]
+        deviations = returns[:, np.newaxis] - self.means
+        self.covariances = (np.einsum('ts,tsi,tsj->sij', weights, deviations, deviations)
+                            / total[:, np.newaxis, np.newaxis] + 1e-6 * np.eye(2))
+
+    def regime_probabilities(self, returns, initial):
+        """Run the scaled forward backward recursions of the regimes.
+
+        Returns the probabilities of the regimes each year given the past years, given all the
+        years, and of the regimes of consecutive years.
+        """
+        densities = gaussian_densities(returns, self.means, self.covariances)
+        forward = np.empty_like(densities)
+        backward = np.ones_like(densities)
+        forward[0] = initial * densities[0] / np.sum(initial * densities[0])
+        for i in range(1, len(returns)):
+            forward[i] = forward[i - 1] @ self.transition * densities[i]
+            forward[i] /= forward[i].sum()
+        for i in range(len(returns) - 2, -1, -1):
+            backward[i] = self.transition @ (densities[i + 1] * backward[i + 1])
+            backward[i] /= backward[i].sum()
+        weights = forward * backward
+        weights /= weights.sum(axis=1, keepdims=True)
+        pairs = (forward[:-1, :, np.newaxis] * self.transition *
+                 (densities[1:] * backward[1:])[:, np.newaxis])
+        pairs /= pairs.sum(axis=(1, 2), keepdims=True)
+        return forward, weights, pairs
+
+    def paths(self, shocks):
+        """Generate the prices paths driven by given standard normal shocks.
+
+        shocks has shape (n_paths, years - 1, 3): two shocks for the returns and one whose
+        probability draws the regime of the year. The regimes are drawn year after year for
+        all the paths at once, the returns of all the years in one operation per regime.
+        """
+        draws = norm.cdf(shocks[..., 2])
+        turbulent = np.empty(draws.shape, dtype=bool)
+        turbulent[:, 0] = draws[:, 0] < self.last_regime @ self.transition[:, 1]
+        for i in range(1, for_values - 1):
+            turbulent[:, i] = draws[:, i] < self.transition[turbulent[:, i - 1] * 1, 1]
+        calm_returns, turbulent_returns = [self.means[regime] +
+                                           shocks[..., :2] @ self.cholesky[regime].T
+                                           for regime in (0, 1)]
+        log_returns = np.where(turbulent[..., np.newaxis], turbulent_returns, calm_returns)
+        return self.start_paths(len(shocks), log_returns)
+
+    def summary(self):
+        result = ""
+        for regime, name in enumerate(["Calm", "Turbulent"]):
+            stdev = np.sqrt(np.diag(self.covariances[regime]))
+            result += (name + " regime, expected duration " +
+                       str(round(1 / (1 - self.transition[regime, regime]), 1)) + " years\n" +
+                       "Mean log returns Coal, Gas : " + str(np.round(self.means[regime], 3)) +
+                       "\n" + "Standard Deviations Coal, Gas : " + str(np.round(stdev, 2)) +
+                       "\n" + "Correlation factor : " +
+                       str(round(self.covariances[regime, 0, 1] / np.prod(stdev), 2)) + "\n\n")
+        return result
+
+class correlated_gbm_model(price_model):
+    """Geometric brownian movements of any number of correlated commodity prices.
+
+    past_prices is a Dataframe with one column per commodity, for example coal, gas, oil,
+    biomass and carbon prices. The drifts and the full covariance matrix of the log returns are
+    estimated on the years where all the series are known. The shocks are correlated with the
+    Cholesky factor of the covariance, so all the commodities are drawn in one batched call.
+    The paths have the commodities on their last axis, in the order of the columns.
+    """
+
+    def __init__(self, past_prices):
+        """Estimate the drifts and the covariance of the log returns of the past prices."""
+        self.commodities = list(past_prices.columns)
+        past = past_prices.dropna()
+        log_returns = np.diff(np.log(past.to_numpy(dtype=np.float64)), axis=0)
+        self.covariance = np.atleast_2d(np.cov(log_returns, rowvar=False))
+        self.stdev = np.sqrt(np.diag(self.covariance))
+        self.drift = log_returns.mean(axis=0) - 0.5 * self.stdev ** 2
+        self.correlation = self.covariance / np.outer(self.stdev, self.stdev)
+        self.cholesky = np.linalg.cholesky(self.covariance)
+        self.shock_shape = (for_values - 1, len(self.commodities))
+        self.past_last = past_prices.ffill().iloc[-1].to_numpy(dtype=np.float64)
+
+    @property
+    def last_prices(self):
+        return self.past_last
+
+    def paths(self, shocks):
+        """Generate the prices paths driven by independent standard normal shocks.
+
+        shocks has shape (n_paths, years - 1, commodities), returns (n_paths, years, commodities).
+        """
+        return self.start_paths(len(shocks), self.drift + shocks @ self.cholesky.T)
+
+    def summary(self):
+        return ("Drift values : " + str(dict(zip(self.commodities, np.round(self.drift, 3)))) +
+                "\n" + "Standard Deviations : " +
+                str(dict(zip(self.commodities, np.round(self.stdev, 2)))) + "\n\n" +
+                "Correlation matrix\n" +
+                str(pd.DataFrame(self.correlation, self.commodities, self.commodities).round(2)) +
+                "\n")
+
+def coal_gas_gbm_model(past_gas, past_coal):
+    """Return the correlated_gbm_model of the coal and gas prices, with their full covariance."""
+    return correlated_gbm_model(joint_prices(past_gas, past_coal))
+
+price_models = {"gbm": gbm_price_model, "bootstrap": block_bootstrap_model,
+                "ou": ou_price_model, "regime_switching": regime_switching_model,
+                "correlated_gbm": coal_gas_gbm_model}
+
+fitted_models = {}
+
+def fitted_price_model(past_gas=price_gas, past_coal=price_coal, model="gbm"):
+    """Return the model of the past data, calibrated once per model and data content.
+
+    model is one of the names of price_models.
+    """
+    if model not in price_models:
+        raise ValueError("Unknown price model " + str(model) + ", use one of " +
+                         str(list(price_models)))
+    key = content_hash(model, past_gas, past_coal)
+    if key not in fitted_models:
+        fitted_models[key] = price_models[model](past_gas, past_coal)
+    return fitted_models[key]
+
+def fitted_source_model(source=default_source, model="gbm"):
+    """Return the model calibrated on the past data of a source, see past_prices."""
+    return fitted_price_model(*past_prices(source), model)
+
+def price_paths(n_paths, past_gas=price_gas, past_coal=price_coal, random_state=np.random,
+                model="gbm"):
+    """Generate n_paths pairs of correlated prices paths in one vectorized call.
+
+    By default the same geometric brownian movement as international_prices_path,
+    see gbm_price_model.
+    """
+    return fitted_price_model(past_gas, past_coal, model).price_paths(n_paths, random_state)
+
+sampling_strategies = ["random", "antithetic", "latin_hypercube", "sobol"]
+
+def price_shocks(n_paths, strategy="random", seed=0, start=0, shape=(for_values - 1, 2)):
+    """Return standard normal shocks for the paths method of price models.
+
+    The shocks have the shape (n_paths,) + shape.
+
+    The default shape is the shock_shape of gbm_price_model: one gas and one coal shock a year.
+
+    random           independent pseudo-random draws
+    antithetic       pairs of opposite draws, shocks[1::2] = - shocks[0::2]
+    latin_hypercube  one draw in each of n_paths equiprobable strata, on each dimension
+    sobol            scrambled Sobol low discrepancy sequence, best with powers of 2
+
+    Ensembles can be drawn in chunks, start is the index of the first path.
+    For random, path i takes its own block of the stream of a counter-based generator keyed on
+    seed, so the paths depend neither on the chunks nor on the seeds of other ensembles. For
+    sobol, the chunks are consecutive parts of one sequence. For the other strategies, each
+    chunk is drawn from its own stream, seeded by seed and start.
+    """
+    dimension = int(np.prod(shape))
+    rng = np.random.default_rng([seed, start])
+    if strategy == "random":
+        # A Philox counter step gives 4 uniforms, path i starts at step i * width / 4
+        width = -(-dimension // 4) * 4
+        bit_generator = np.random.Philox(key=seed)
+        bit_generator.advance(start * width // 4)
+        uniforms = np.random.Generator(bit_generator).random((n_paths, width))[:, :dimension]
+        shocks = ndtri(uniforms + 2.0**-54)
+    elif strategy == "antithetic":
+        half = rng.standard_normal(((n_paths + 1) // 2, dimension))
+        shocks = np.stack([half, -half], axis=1).reshape(-1, dimension)[:n_paths]
+    elif strategy == "latin_hypercube":
+        shocks = norm.ppf(qmc.LatinHypercube(dimension, seed=rng).random(n_paths))
+    elif strategy == "sobol":
+        engine = qmc.Sobol(dimension, scramble=True, seed=seed)
+        if start:
+            engine.fast_forward(start)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="The balance properties")
+            shocks = norm.ppf(engine.random(n_paths))
+    else:
+        raise ValueError("Unknown sampling strategy " + str(strategy) + ", use one of " +
+                         str(sampling_strategies))
+    return shocks.reshape((n_paths,) + tuple(shape))
+
+def international_prices_frame(path):
+    """Return the international prices Dataframe of one path of a price model."""
+    return pd.DataFrame({'Coal': path[:, 0], 'Gas': path[:, 1]},
+                        index=range(start_year, end_year+1))
+
 class international_prices_path():
     """ An international prices forecast, based on historical data and geometric brownian
     movement"""
@@ -92,38 +565,22 @@ class international_prices_path():
     def __init__(self, past_gas, past_coal):
         self.past_gas = past_gas
         self.past_coal = past_coal
-        self.coef_cor = self.realized_pairwise_correlation()
+        self.model = fitted_price_model(past_gas, past_coal)
+        self.coef_cor = self.model.coef_cor
         self.forecast_price = self.price_path()
         self.international_prices = pd.DataFrame({'Coal': self.forecast_price[1],
                                       'Gas': self.forecast_price[0]},
         index=range(start_year, end_year+1))
 
     def realized_pairwise_correlation(self):
-        "Calculate the correlation factor of past data"
-        c_coal = [c[0] for c in np.array(self.past_coal)[7:]]
-        c_gas = [g[0] for g in np.array(self.past_gas)]
-        x_gas = x_function(c_gas)
-        x_coal = x_function(c_coal)
-        av_gas = average_coeff(x_gas)
-        av_coal = average_coeff(x_coal)
-        coef_gas = []
-        coef_coal = []
-
-        for i, _ in enumerate(x_gas):
-            coef_gas.append(x_gas[i] - av_gas)
-            coef_coal.append(x_coal[i] - av_coal)
-
-        coef_cor = sum(a * b for (a, b)\
-                       in zip(coef_gas, coef_coal)) / np.sqrt(sum(a * b for (a, b)\
-                                  in zip(coef_gas, coef_gas)) * sum(a * b for (a, b) \
-                                        in zip(coef_coal, coef_coal)))
-        return coef_cor
+        "Correlation factor of past data"
+        return self.model.coef_cor
 
     def price_path(self):
         "Generate two correlated prices paths"
         b = [random(), random()]
-        drift = [log_returns(self.past_gas)[0], log_returns(self.past_coal)[0]]
-        stdev = [log_returns(self.past_gas)[1], log_returns(self.past_coal)[1]]
+        drift = [self.model.drift_gas, self.model.drift_coal]
+        stdev = [self.model.stdev_gas, self.model.stdev_coal]
         yearly_returns = [np.exp(drift[0] + stdev[0] * b[0]), np.exp(drift[1] + stdev[1] *
                           (self.coef_cor * b[0] + np.sqrt(1-self.coef_cor**2) * b[1]))]
 
@@ -145,15 +602,7 @@ class international_prices_path():
         return for_gas, for_coal
 
     def summary(self):
-        return ("Gaz prices\n" +
-                "Drift value : " + str(round(log_returns(self.past_gas)[0], 3)) + "\n" +
-                "Standard Deviation : " + str(round(log_returns(self.past_gas)[1], 2))+"\n\n"+
-                "Coal prices\n" +
-                "Drift value : " + str(round(log_returns(self.past_coal)[0], 3)) + "\n" +
-                "Standard Deviation : " + str(round(log_returns(self.past_coal)[1], 2)) +
-                "\n\n" +
-                "Correlation factor between the two series: " + str(round(self.coef_cor, 2)) + "\n"
-                )
+        return self.model.summary()
 
     def summarize(self):
         print(self.summary())
@@ -168,3 +617,6 @@ if __name__ == '__main__':
               ******************************************
               """)
         international_prices_path(price_gas, price_coal).summarize()
+
+    if (len(sys.argv) == 3) and (sys.argv[1] == "summarize"):
+        fitted_price_model(price_gas, price_coal, sys.argv[2]).summarize()
@@ -0,0 +1,198 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""Test the streaming statistics of ensembles against the statistics of all the samples."""
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+import price_LCOE_run
+from EnsembleStatistics import EnsembleStatistics
+from distribution_plots import plot_fan, plot_histogram
+from init import MUSD, GUSD
+from plan_baseline import baseline
+from plan_withCCS import withCCS
+from price_fuel import Fuel_Price
+from price_LCOE_run import multiple_LCOE, paired_LCOE, chunk_prices, ensemble_chunk
+from prices_data_international import price_gas, price_coal, international_prices_frame
+from prices_data_local import local_prices
+from production_data_local import local_production
+from Run import Run
+
+
+def test_exact_while_small():
+    """Until the capacity is reached, moments and quantiles are those of numpy."""
+    samples = np.random.RandomState(0).lognormal(size=(300, 4, 2))
+    statistics = EnsembleStatistics(shape=(4, 2), capacity=300)
+    for batch in np.array_split(samples, 7):
+        statistics.update(batch)
+    assert statistics.quantiles.exact
+    assert np.allclose(statistics.mean, samples.mean(axis=0), rtol=1e-14)
+    assert np.allclose(statistics.std, samples.std(axis=0, ddof=1), rtol=1e-12)
+    assert np.array_equal(statistics.quantile(0.95), np.percentile(samples, 95, axis=0))
+
+
+def test_bounded_memory():
+    """Beyond the capacity, the quantiles are approximate with a small rank error."""
+    samples = np.random.RandomState(1).normal(size=100000)
+    statistics = EnsembleStatistics(edges=np.linspace(-3, 3, 61), capacity=500)
+    halves = EnsembleStatistics(edges=np.linspace(-3, 3, 61), capacity=500)
+    other = EnsembleStatistics(edges=np.linspace(-3, 3, 61), capacity=500)
+    for batch in np.array_split(samples, 100):
+        statistics.update(batch)
+    halves.update(samples[:50000])
+    other.update(samples[50000:])
+    halves.merge(other)
+    for summary in [statistics, halves]:
+        assert sum(len(kept) for kept in summary.quantiles.levels) < 5000
+        ranks = [np.mean(samples < value) for value in summary.quantiles.quantiles()]
+        assert np.allclose(ranks, [0.05, 0.5, 0.95], atol=0.005)
+        assert np.isclose(summary.mean, samples.mean())
+        histogram = summary.histogram
+        assert histogram.counts.sum() + histogram.below + histogram.above == len(samples)
+
+
+def test_summary_and_plot_share_one_pass(tmp_path):
+    """The LCOE statistics are those of the sorted list of runs, the plot reuses them."""
+    ensemble = multiple_LCOE(baseline, 30)
+    lcoe = ensemble.multiple_run()
+    lcoe_statistics, cost_statistics = ensemble.statistics
+    assert np.isclose(lcoe_statistics.mean, np.mean(lcoe))
+    assert lcoe_statistics.quantile(0.95) == np.percentile(lcoe, 95)
+    assert ensemble.cost_quantile(0.5).shape == (35, 12)
+    ensemble.plot(str(tmp_path / "lcoe.png"))
+    assert ensemble.statistics[0] is lcoe_statistics
+
+
+def test_plots_from_aggregates():
+    """The plots draw as many artists for a million samples as for a hundred."""
+    probabilities = (0.05, 0.25, 0.5, 0.75, 0.95)
+    artists = []
+    for n_samples in [100, 10**6]:
+        samples = np.random.RandomState(0).lognormal(size=(n_samples, 35))
+        statistics = EnsembleStatistics(shape=(35,), probabilities=probabilities,
+                                        edges=np.linspace(0, 10, 51))
+        statistics.update(samples)
+        _, ax = plt.subplots()
+        plot_fan(ax, np.arange(35), probabilities, statistics.quantiles.quantiles())
+        plot_histogram(ax, statistics.histogram.edges, statistics.histogram.counts)
+        artists.append((len(ax.collections), len(ax.lines), len(ax.patches)))
+        plt.close(ax.figure)
+    assert artists[0] == artists[1] == (2, 1, 50)
+
+
+def test_early_stopping():
+    """Sampling stops at the first chunk where the confidence intervals are within tolerance."""
+    loose = multiple_LCOE(baseline, 60, tolerance=0.3)
+    loose.chunk_size = 10
+    assert loose.samples_used == 10
+    lcoe_statistics = loose.statistics[0]
+    assert lcoe_statistics.mean_interval() < 0.3
+    assert lcoe_statistics.quantile_interval(0.95) < 0.3
+    lcoe = loose.multiple_run()
+    assert len(lcoe) == 10
+    assert lcoe_statistics.quantile(0.95) == np.percentile(lcoe, 95)
+    strict = multiple_LCOE(baseline, 30, tolerance=1e-6)
+    strict.chunk_size = 10
+    assert strict.samples_used == 30
+    assert "LCOE for 30 gas" in strict.summary()
+
+
+def test_root_seeds_give_new_ensembles():
+    """Only the legacy sampling shares samples between the ensembles of root seeds 0 and 1."""
+    first = chunk_prices(range(0, 5))
+    second = chunk_prices(range(1, 6), root_seed=1)
+    assert not np.any(np.isclose(first[:, 1:], second[:, 1:]))
+    legacy_first = chunk_prices(range(0, 5), "legacy")
+    legacy_second = chunk_prices(range(1, 6), "legacy", root_seed=1)
+    assert np.array_equal(legacy_first[1:], legacy_second[:-1])
+
+
+def test_sobol_ensemble_in_chunks():
+    """A Sobol ensemble does not depend on how it is chunked."""
+    whole = multiple_LCOE(baseline, 16, sampling="sobol")
+    whole.chunk_size = 16
+    chunked = multiple_LCOE(baseline, 16, sampling="sobol")
+    chunked.chunk_size = 8
+    assert np.allclose(whole.multiple_run(), chunked.multiple_run(), rtol=1e-12)
+
+
+def test_paired_ensemble():
+    """Both plans run on the same prices, the differences are those of separate runs."""
+    paired = paired_LCOE(baseline, withCCS, 6, root_seed=3)
+    differences = []
+    for path in chunk_prices(range(3, 9), root_seed=3):
+        prices = international_prices_frame(path)
+        parameters = Fuel_Price(local_prices, price_gas, price_coal, local_production, baseline,
+                                prices).parameters
+        bau, alt = [Run(plan, parameters) for plan in [baseline, withCCS]]
+        differences.append((alt.total_cost - bau.total_cost) * MUSD / GUSD)
+    cost_difference = paired.statistics["Cost difference"]
+    assert paired.samples_used == 6
+    assert np.isclose(cost_difference.mean, np.mean(differences), rtol=1e-12)
+    assert np.isclose(cost_difference.quantile(0.5), np.median(differences), rtol=1e-12)
+    assert paired.table().shape == (5, 5)
+    separate = multiple_LCOE(withCCS, 6, root_seed=3).statistics[0]
+    assert np.isclose(paired.statistics["ALT LCOE"].mean, separate.mean, rtol=1e-12)
+    paired_error, independent_error = paired.standard_errors()
+    assert paired_error < independent_error
+
+
+def test_resume_from_checkpoint(tmp_path, monkeypatch):
+    """An ensemble interrupted after some chunks resumes from its checkpoint, same results."""
+    def ensemble(**kwargs):
+        result = multiple_LCOE(baseline, 50, sampling="sobol", **kwargs)
+        result.chunk_size = 10
+        result.checkpoint_seconds = 0
+        return result
+
+    path = str(tmp_path / "ensemble.pickle")
+    calls = []
+
+    def crashing_chunk(*arguments):
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        calls.append(arguments)
+        return ensemble_chunk(*arguments)
+
+    monkeypatch.setattr(price_LCOE_run, "ensemble_chunk", crashing_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        ensemble(checkpoint=path).statistics
+    monkeypatch.undo()
+    monkeypatch.setattr(price_LCOE_run, "ensemble_version", "edited code")
+    with pytest.raises(ValueError):
+        ensemble(checkpoint=path).statistics
+    monkeypatch.undo()
+    resumed = ensemble(checkpoint=path)
+    lcoe_statistics, cost_statistics = resumed.statistics
+    expected_lcoe, expected_cost = ensemble().statistics
+    assert lcoe_statistics.count == 50
+    assert lcoe_statistics.mean == expected_lcoe.mean
+    assert np.array_equal(lcoe_statistics.quantiles.quantiles(),
+                          expected_lcoe.quantiles.quantiles())
+    assert np.array_equal(cost_statistics.std, expected_cost.std)
+    with pytest.raises(ValueError):
+        multiple_LCOE(baseline, 60, checkpoint=path).statistics
+
+
+def test_bootstrap_ensemble():
+    """The price model is a choice of the ensemble, the legacy sampling stays reproducible."""
+    ensemble = multiple_LCOE(baseline, 20, sampling="legacy", price_model="bootstrap")
+    assert ensemble.multiple_run() == ensemble.multiple_run()
+    assert ensemble.multiple_run() != multiple_LCOE(baseline, 20).multiple_run()
+    paired = paired_LCOE(baseline, withCCS, 16, sampling="sobol", price_model="bootstrap")
+    assert paired.samples_used == 16
+
+
+def test_sources_ensemble():
+    """An ensemble across the prices data sources gives the LCOE of one ensemble per source."""
+    ensemble = price_LCOE_run.sources_LCOE(baseline, 12)
+    assert ensemble.price_source == ("WB", "BP", "EIA")
+    for i, source in enumerate(ensemble.price_source):
+        alone = multiple_LCOE(baseline, 12, price_source=source).statistics[0]
+        assert np.isclose(ensemble.statistics.mean[i], alone.mean, rtol=1e-12)
+    assert ensemble.table().shape == (3, 4)
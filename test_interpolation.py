@@ -0,0 +1,61 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""Test the interpolation of yearly series against scipy and numpy."""
+
+import numpy as np
+import pytest
+from scipy.interpolate import lagrange, PchipInterpolator
+
+from interpolation import interpolate
+from prices_data_local import local_prices, x_coal, y_coal
+
+x = np.array([2015, 2020, 2025, 2030])
+years = np.arange(2010, 2051)
+
+
+def test_methods_inside():
+    """Between the known years, the methods agree with numpy and scipy."""
+    y = np.array([3.0, 5.0, 4.0, 8.0])
+    assert np.allclose(interpolate(x, y, years, "linear"), np.interp(years, x, y))
+    inside = years[(years >= 2015) & (years <= 2030)]
+    assert np.allclose(interpolate(x, y, inside, "pchip"), PchipInterpolator(x, y)(inside))
+    assert np.allclose(interpolate(x, y, inside, "lagrange"), lagrange(x - 2015, y)(inside - 2015))
+    assert np.array_equal(interpolate(x, y, x, "lagrange"), y)
+    with pytest.raises(ValueError):
+        interpolate(x, y, years, "spline")
+
+
+def test_extrapolation_policies():
+    """Outside the known years, the values are held, extended, linear or missing."""
+    y = np.array([3.0, 5.0, 4.0, 8.0])
+    held = interpolate(x, y, years, "lagrange", "hold")
+    assert np.all(held[years < 2015] == 3) and np.all(held[years > 2030] == 8)
+    extended = interpolate(x, y, years, "lagrange", "extend")
+    assert np.allclose(extended, lagrange(x - 2015, y)(years - 2015))
+    linear = interpolate(x, y, years, "pchip", "linear")
+    assert np.isclose(linear[years == 2040][0], 8 + 10 * 4 / 5)
+    assert np.isclose(linear[years == 2010][0], 3 - 5 * 2 / 5)
+    assert np.isnan(interpolate(x, y, years, "linear", "nan")[years > 2030]).all()
+    with pytest.raises(ValueError):
+        interpolate(x, y, years, "linear", "zero")
+
+
+def test_batch_of_series():
+    """A stack of series is interpolated in one call, as each series alone."""
+    y = np.random.RandomState(0).lognormal(size=(500, 2, len(x)))
+    for method in ["linear", "pchip", "lagrange"]:
+        batch = interpolate(x, y, years, method)
+        assert batch.shape == (500, 2, len(years))
+        assert np.allclose(batch[123, 1], interpolate(x, y[123, 1], years, method))
+
+
+def test_local_prices():
+    """The local coal price goes through the data, and is held after 2030."""
+    assert np.allclose(local_prices.Coal[[2020, 2025, 2030]], y_coal[1:], rtol=1e-15)
+    assert (local_prices.loc[2030:, "Coal"] == local_prices.Coal[2030]).all()
+    assert (local_prices.loc[2025:, "Gas"] == local_prices.Gas[2025]).all()
+    assert list(x_coal) == [2015, 2020, 2025, 2030]
@@ -6,14 +6,20 @@ Created on Sat Feb 10 22:18:16 2018
 """
 from random import randint
 import numpy as np
+import pytest
+from scipy.stats import norm
 
-from price_fuel import Fuel_Price
+from price_fuel import Fuel_Price, fuel_supply, scaled_parameters
 from prices_data_local import local_prices
 from plan_baseline import baseline
-from prices_data_international import price_gas, price_coal
+from prices_data_international import price_gas, price_coal, price_paths, log_returns,\
+    realized_pairwise_correlation, fitted_price_model, international_prices_path, price_shocks,\
+    international_prices_frame, correlated_gbm_model, joint_log_prices, past_prices,\
+    fitted_source_model, price_model
 from production_data_local import local_production
 from param_reference import heat_rate
-from init import pd, start_year, end_year
+from Run import RunBatch
+from init import pd, start_year, end_year, sources, MBtu
 
 
 def test_international_dependency():
@@ -80,3 +86,162 @@ def test_between_two_values():
     .min(axis=1).all() <= fuel_1.average_price["Gas"].all()
     assert fuel_1.average_price["Gas"].all() <= pd.concat([fuel_1.international_prices["Gas"],
                                local_prices["Gas"]], axis=1).max(axis=1).all()
+
+def test_price_paths_statistics():
+    """Check that the batched price paths follow the calibrated geometric brownian movement"""
+    paths = price_paths(20000, random_state=np.random.RandomState(0))
+    assert paths.shape == (20000, end_year + 1 - start_year, 2)
+    assert np.all(paths[:, 0, 0] == price_coal.iloc[-1, 0])
+    assert np.all(paths[:, 0, 1] == price_gas.iloc[-1, 0])
+    returns = np.diff(np.log(paths), axis=1).reshape(-1, 2)
+    drift = [log_returns(price_coal)[0], log_returns(price_gas)[0]]
+    stdev = [log_returns(price_coal)[1], log_returns(price_gas)[1]]
+    assert np.allclose(returns.mean(axis=0), drift, atol=0.002)
+    assert np.allclose(returns.std(axis=0), stdev, rtol=0.01)
+    assert np.isclose(np.corrcoef(returns.T)[0, 1],
+                      realized_pairwise_correlation(price_gas, price_coal), atol=0.01)
+
+def test_price_model_calibrated_once():
+    """Check that the price model of a data source is calibrated once, and reused by samplers"""
+    model = fitted_price_model(price_gas, price_coal)
+    assert fitted_price_model(price_gas.copy(), price_coal.copy()) is model
+    assert international_prices_path(price_gas, price_coal).model is model
+    assert model.coef_cor == realized_pairwise_correlation(price_gas, price_coal)
+    assert (model.drift_gas, model.stdev_gas) == log_returns(price_gas)
+
+def test_sampling_strategies():
+    """Check the structure of the price shocks of each sampling strategy"""
+    random = price_shocks(10, "random", seed=1, shape=(7,))
+    assert np.array_equal(np.concatenate([price_shocks(3, "random", seed=1, shape=(7,)),
+                                          price_shocks(7, "random", seed=1, start=3,
+                                                       shape=(7,))]), random)
+    assert not np.any(np.isclose(price_shocks(10, "random", seed=2, shape=(7,)), random))
+    antithetic = price_shocks(10, "antithetic", seed=1)
+    assert np.array_equal(antithetic[1::2], -antithetic[0::2])
+    latin_hypercube = norm.cdf(price_shocks(50, "latin_hypercube", seed=1))
+    strata = np.sort(np.floor(latin_hypercube * 50), axis=0)
+    assert np.all(strata == np.arange(50)[:, np.newaxis, np.newaxis])
+    sobol = price_shocks(16, "sobol", seed=2)
+    assert np.allclose(np.concatenate([price_shocks(8, "sobol", seed=2),
+                                       price_shocks(8, "sobol", seed=2, start=8)]), sobol)
+    model = fitted_price_model(price_gas, price_coal)
+    assert np.allclose(model.paths(sobol)[:, 0], model.price_paths(1)[0, 0])
+    with pytest.raises(ValueError):
+        price_shocks(4, "halton")
+
+def test_fuel_supply_prices_batches():
+    """Check that a batch of prices paths gives the heat prices of one Fuel_Price per path"""
+    paths = price_paths(5, random_state=np.random.RandomState(1))
+    heat_prices = fuel_supply(baseline).parameters(paths).heat_price
+    assert heat_prices.shape == (5, end_year + 1 - start_year, len(sources))
+    for path, heat_price in zip(paths, heat_prices):
+        fuel = Fuel_Price(local_prices, price_gas, price_coal, local_production, baseline,
+                          international_prices_frame(path))
+        assert np.array_equal(fuel.parameters.arrays.heat_price, heat_price)
+    assert fuel_supply(baseline) is fuel_supply(baseline)
+
+def test_block_bootstrap():
+    """Check that bootstrap paths chain blocks of past joint returns, for any sampling"""
+    model = fitted_price_model(price_gas, price_coal, "bootstrap")
+    assert fitted_price_model(price_gas, price_coal, "bootstrap") is model
+    paths = price_paths(1000, random_state=np.random.RandomState(0), model="bootstrap")
+    assert paths.shape == (1000, end_year + 1 - start_year, 2)
+    returns = np.diff(np.log(paths), axis=1)
+    past = {tuple(r) for r in np.round(model.log_returns, 12)}
+    assert all(tuple(r) in past for r in np.round(returns[:20].reshape(-1, 2), 12))
+    # Consecutive years follow each other within a block
+    start = np.flatnonzero(np.all(np.isclose(model.log_returns, returns[0, 0]), axis=1))[0]
+    block = (start + np.arange(model.block_length)) % len(model.log_returns)
+    assert np.allclose(returns[0, :model.block_length], model.log_returns[block])
+    sobol = model.paths(price_shocks(64, "sobol", seed=1, shape=model.shock_shape))
+    assert np.all(sobol[:, 0] == paths[0, 0])
+    with pytest.raises(ValueError):
+        fitted_price_model(price_gas, price_coal, "arima")
+
+def test_mean_reverting_model():
+    """Check that the Ornstein-Uhlenbeck log prices follow their recurrence and stay bounded"""
+    model = fitted_price_model(price_gas, price_coal, "ou")
+    assert 0 < model.b_coal < 1 and 0 < model.b_gas < 1
+    shocks = price_shocks(4000, "random", seed=3)
+    paths = model.paths(shocks)
+    log_gas = np.log(paths[:, :, 1])
+    assert np.allclose(log_gas[:, 1:], model.a_gas + model.b_gas * log_gas[:, :-1] +
+                       model.stdev_gas * shocks[..., 0])
+    spread = np.log(paths[:, -1]).std(axis=0)
+    gbm_spread = np.log(fitted_price_model(price_gas, price_coal).paths(shocks)[:, -1]).std(axis=0)
+    assert np.all(spread < gbm_spread / 2)
+    stationary = model.stdev_gas / np.sqrt(1 - model.b_gas ** 2)
+    assert np.isclose(spread[1], stationary, rtol=0.05)
+    assert "Long term price : " + str(round(np.exp(model.a_gas / (1 - model.b_gas)) * MBtu, 2)) \
+        in model.summary()
+    with pytest.raises(TypeError):
+        price_model()
+
+def test_regime_switching_model():
+    """Check the calibrated regimes, and that the regime shocks select the regimes"""
+    model = fitted_price_model(price_gas, price_coal, "regime_switching")
+    assert np.allclose(model.transition.sum(axis=1), 1)
+    assert np.all(np.diag(model.covariances[1]) > np.diag(model.covariances[0]))
+    shocks = price_shocks(10, "random", seed=4, shape=model.shock_shape)
+    shocks[..., 2] = 10
+    calm = np.diff(np.log(model.paths(shocks)), axis=1)
+    assert np.allclose(calm, model.means[0] + shocks[..., :2] @ model.cholesky[0].T)
+    assert price_paths(50, model="regime_switching").shape == (50, end_year + 1 - start_year, 2)
+
+def test_fuel_price_models():
+    """Check that Fuel_Price draws its forecast from the chosen model"""
+    np.random.seed(5)
+    fuel = Fuel_Price(local_prices, price_gas, price_coal, local_production, baseline,
+                      price_model="ou")
+    np.random.seed(5)
+    path = fitted_price_model(price_gas, price_coal, "ou").price_paths(1)[0]
+    assert np.array_equal(fuel.international_prices.to_numpy(), path)
+
+def test_correlated_commodities():
+    """Check that the N commodities paths have the covariance of the past log returns"""
+    model = fitted_price_model(price_gas, price_coal, "correlated_gbm")
+    past_returns = np.diff(joint_log_prices(price_gas, price_coal), axis=0)
+    assert np.allclose(model.covariance, np.cov(past_returns, rowvar=False))
+    rng = np.random.RandomState(6)
+    years = np.arange(1978, 2017)
+    oil = 50 * np.exp(np.cumsum(0.3 * rng.standard_normal(len(years))))
+    carbon = 10 * np.exp(np.cumsum(0.1 * rng.standard_normal(len(years))))
+    past = pd.DataFrame({'Coal': price_coal.iloc[:, 0], 'Gas': price_gas.iloc[:, 0],
+                         'Oil': pd.Series(oil, years) * np.sqrt(price_gas.iloc[:, 0]),
+                         'Carbon': pd.Series(carbon, years)}).loc[1970:2016]
+    model = correlated_gbm_model(past)
+    assert model.commodities == ['Coal', 'Gas', 'Oil', 'Carbon']
+    paths = model.price_paths(20000, np.random.RandomState(7))
+    assert paths.shape == (20000, end_year + 1 - start_year, 4)
+    assert np.array_equal(paths[0, 0], past.iloc[-1].to_numpy())
+    returns = np.diff(np.log(paths), axis=1).reshape(-1, 4)
+    assert np.allclose(np.corrcoef(returns.T), model.correlation, atol=0.01)
+    assert np.allclose(returns.mean(axis=0), model.drift, atol=0.002)
+
+def test_scaled_parameters():
+    """Check that relative prices paths of other commodities scale the stacked parameters"""
+    relative = np.exp(np.cumsum(np.random.RandomState(8).normal(0, 0.1, (3, 35)), axis=1))
+    arrays = scaled_parameters(fuel_supply(baseline).parameters(price_paths(3)),
+                               {"Oil": relative, "Carbon": relative[::-1]})
+    assert arrays.heat_price.shape == (3, 35, len(sources))
+    oil = sources.index("Oil")
+    reference = fuel_supply(baseline).parameters(price_paths(1)).heat_price[0]
+    assert np.allclose(arrays.heat_price[..., oil], reference[:, oil] * relative)
+    assert np.allclose(arrays.heat_price[..., sources.index("Wind")],
+                       reference[:, sources.index("Wind")])
+    lcoe = RunBatch(baseline, arrays).lcoe
+    one = arrays._replace(heat_price=arrays.heat_price[1], carbon_price=arrays.carbon_price[1])
+    assert np.isclose(RunBatch(baseline, one).lcoe, lcoe[1], rtol=1e-12)
+
+def test_price_sources():
+    """Check that every data source is read once, and calibrated once per model"""
+    past_gas, past_coal = past_prices("WB")
+    assert past_gas is price_gas and past_coal is price_coal
+    for source in ["BP", "EIA"]:
+        assert past_prices(source) is past_prices(source)
+        assert past_prices(source)[0].index[-1] == past_prices(source)[1].index[-1] == 2016
+        assert fitted_source_model(source) is fitted_source_model(source)
+        assert -1 < fitted_source_model(source).coef_cor < 1
+    assert fitted_source_model("EIA").last_gas != fitted_source_model("WB").last_gas
+    with pytest.raises(ValueError):
+        past_prices("IEA")
@@ -17,7 +17,7 @@ from production_data_local import local_production
 from Run import RunPair
 from prices_data_international import international_prices_path, price_gas, price_coal
 from price_fuel import Fuel_Price
-from price_LCOE_run import multiple_LCOE
+from price_LCOE_run import multiple_LCOE, report_sampling
 from analysis import RUNPAIRS
 # pylint and pytest known compatibility bug
 # pylint: disable=redefined-outer-name
@@ -69,5 +69,5 @@ def test_fuel_price(regtest):
 
 
 def test_lcoe_prices(regtest):
-    lcoe_list = multiple_LCOE(baseline, 100)
+    lcoe_list = multiple_LCOE(baseline, 100, sampling=report_sampling)
     regtest.write(lcoe_list.summary())
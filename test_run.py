@@ -0,0 +1,214 @@
+# encoding: utf-8
+#
+# (c) Minh Ha-Duong  2017
+# minh.haduong@gmail.com
+# Creative Commons Attribution-ShareAlike 4.0 International
+#
+"""Test the array evaluation of the model against single runs."""
+
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from plan_baseline import baseline
+from plan_withCCS import withCCS
+from Parameter import stack
+from PowerPlan import PowerPlan
+from init import MUSD, GUSD
+from Run import Run, RunBatch, RunPair, code_digest
+from CompiledRun import CompiledRun
+from ResultCache import ResultCache
+from analysis import ENSEMBLE
+from price_LCOE_run import multiple_LCOE
+
+
+def test_batch_equals_runs():
+    """An ensemble run gives the same totals as separate runs, in any stacking."""
+    for plan in [baseline, withCCS]:
+        batch = RunBatch(plan, ENSEMBLE)
+        assert len(batch) == len(ENSEMBLE)
+        runs = [Run(plan, parameter) for parameter in ENSEMBLE]
+        for name in RunBatch.totals:
+            expected = [getattr(run, name) for run in runs]
+            assert np.allclose(getattr(batch, name), expected, rtol=1e-12), name
+
+
+def test_batch_broadcasts_common_fields():
+    """Fields equal in all the parameters are not stacked."""
+    arrays = stack(ENSEMBLE)
+    assert np.shape(arrays.discount_rate) == (len(ENSEMBLE),)
+    assert arrays.heat_rate.shape == ENSEMBLE[0].arrays.heat_rate.shape
+    batch = RunBatch(baseline, [ENSEMBLE[0]] * 3)
+    assert batch.lcoe.shape == (3,)
+    assert np.all(batch.lcoe == Run(baseline, ENSEMBLE[0]).lcoe)
+
+
+def test_batch_over_plans_and_parameters():
+    """Plans and parameters stack on two axes, salvage values included."""
+    batch = RunBatch([baseline, withCCS], ENSEMBLE)
+    assert batch.shape == (2, len(ENSEMBLE))
+    for i, plan in enumerate([baseline, withCCS]):
+        for j, parameter in enumerate(ENSEMBLE):
+            run = Run(plan, parameter)
+            assert np.isclose(batch.total_salvage_value[i, j], run.total_salvage_value)
+            assert np.isclose(batch.lcoe[i, j], run.lcoe, rtol=1e-12)
+            assert np.isclose(batch.total_emissions[i, j], run.total_emissions, rtol=1e-12)
+
+
+def test_lazy_run():
+    """A lazy run computes only what is asked for, and the same values."""
+    lazy = Run(withCCS, ENSEMBLE[0], lazy=True)
+    assert lazy.total_emissions == Run(withCCS, ENSEMBLE[0]).total_emissions
+    assert 'fuel_cost_array' not in vars(lazy)
+    assert 'signature' not in vars(lazy)
+    assert lazy.lcoe == Run(withCCS, ENSEMBLE[0]).lcoe
+    assert 'external_cost_array' not in vars(lazy)
+
+
+def test_compiled_run():
+    """Dot products with the compiled coefficients give the totals of the model."""
+    compiled = CompiledRun(withCCS, ENSEMBLE[0])
+    same_structure = [parameter for parameter in ENSEMBLE
+                      if parameter.discount_rate == ENSEMBLE[0].discount_rate]
+    evaluation = compiled.evaluate(stack(same_structure))
+    for i, parameter in enumerate(same_structure):
+        run = Run(withCCS, parameter)
+        assert np.isclose(evaluation.lcoe[i], run.lcoe, rtol=1e-12)
+        assert np.isclose(evaluation.total_emissions[i], run.total_emissions, rtol=1e-12)
+        assert np.isclose(evaluation.total_external_cost[i], run.total_external_cost)
+        assert np.isclose(compiled.evaluate(parameter).total_capture, run.total_capture)
+    with pytest.raises(ValueError):
+        compiled.evaluate(ENSEMBLE[1]._replace(discount_rate=0.1))
+
+
+def test_lcoe_gradient():
+    """The LCOE changes by the gradient times the perturbation of one parameter cell."""
+    parameter = ENSEMBLE[0]
+    gradient = CompiledRun(baseline, parameter).lcoe_gradient()
+    lcoe = Run(baseline, parameter).lcoe
+    for name in ['construction_cost', 'heat_price', 'heat_rate']:
+        field = getattr(parameter, name).copy()
+        field.loc[2030, 'Coal'] += 1
+        perturbed = Run(baseline, parameter._replace(**{name: field})).lcoe
+        assert np.isclose(perturbed - lcoe, gradient[name].loc[2030, 'Coal'], rtol=1e-6)
+
+
+def test_runpair_numeric_results():
+    """The carbon value is computed from unrounded totals, the table once."""
+    pair = RunPair(baseline, withCCS, ENSEMBLE[0])
+    bau, alt, difference = pair.key_results
+    assert difference.CO2_emissions == alt.CO2_emissions - bau.CO2_emissions
+    avoided_cost = ((pair.ALT.total_cost - pair.BAU.total_cost) * MUSD / GUSD
+                    / (pair.BAU.total_emissions - pair.ALT.total_emissions))
+    assert np.isclose(pair.carbon_value(), avoided_cost, rtol=1e-12)
+    assert pair.total(["a", "b", "c"]).columns.tolist() == ["a", "b", "c", "Units"]
+    assert pair.total(["d", "e", "f"]).values.tolist() == pair.total_table.values.tolist()
+
+
+def test_result_cache(tmp_path, monkeypatch):
+    """Runs are read back from the cache, which evicts the least recently used entries."""
+    cache = ResultCache(str(tmp_path), max_bytes=10**9)
+    monkeypatch.setattr(Run, "cache", cache)
+    computed = Run(withCCS, ENSEMBLE[0])
+    assert len(cache.entries()) == 1
+    loaded = Run(withCCS, ENSEMBLE[0])
+    monkeypatch.undo()
+    assert loaded.string() == computed.string()
+    assert loaded.total().equals(computed.total())
+    cache.save('other', {'x': np.zeros(10)})
+    cache.load(computed.cache_key)
+    cache.max_bytes = cache.entries()[-1][1]
+    cache.evict()
+    assert [entry[2] for entry in cache.entries()] == [cache.path(computed.cache_key)]
+
+
+def test_result_cache_damaged_entries(tmp_path, monkeypatch):
+    """Truncated or vanished entries are misses, a failed save leaves no temporary file."""
+    cache = ResultCache(str(tmp_path))
+    cache.save('whole', {'x': np.arange(1000.0)})
+    with open(cache.path('whole'), 'rb') as file:
+        content = file.read()
+    with open(cache.path('whole'), 'wb') as file:
+        file.write(content[:len(content) // 2])
+    assert cache.load('whole') is None
+    assert cache.load('missing') is None
+    def disk_full(*args, **kwargs):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(np, "savez", disk_full)
+    with pytest.raises(OSError):
+        cache.save('other', {'x': np.zeros(2)})
+    assert sorted(os.listdir(str(tmp_path))) == [os.path.basename(cache.path('whole'))]
+
+
+def test_cache_key_follows_the_code(tmp_path, monkeypatch):
+    """The keys of cached runs change with the source of the model computations."""
+    key = Run(withCCS, ENSEMBLE[0], lazy=True).cache_key
+    assert code_digest() in key
+    source = tmp_path / "Run.py"
+    source.write_text("# edited\n")
+    monkeypatch.setattr(Run, "code_version", code_digest([str(source)]))
+    assert Run(withCCS, ENSEMBLE[0], lazy=True).cache_key != key
+
+
+def test_fingerprint_sees_every_value():
+    """Digests change when any single value changes, and only then."""
+    heat_price = ENSEMBLE[0].heat_price.copy()
+    assert ENSEMBLE[0]._replace(heat_price=heat_price).fingerprint == ENSEMBLE[0].fingerprint
+    heat_price.iloc[17, 5] += 1e-9
+    assert ENSEMBLE[0]._replace(heat_price=heat_price).fingerprint != ENSEMBLE[0].fingerprint
+    additions = baseline.additions.copy()
+    additions.iloc[3, 2] += 1
+    plan = PowerPlan(additions, baseline.retirement, baseline.capacity_factor,
+                     baseline.net_import)
+    assert plan.fingerprint != baseline.fingerprint
+
+
+def test_discount_sweep():
+    """A sweep over discount rates gives the results of one run per rate."""
+    pair = RunPair(baseline, withCCS, ENSEMBLE[0])
+    rates = [0.0, 0.04, 0.1]
+    sweep = pair.ALT.discount_sweep(rates)
+    for rate in rates:
+        run = Run(withCCS, ENSEMBLE[0]._replace(discount_rate=rate))
+        assert np.isclose(sweep.loc[rate, "System LCOE"], run.lcoe * 1000, rtol=1e-12)
+        assert np.isclose(sweep.loc[rate, "CO2 cost"], run.total_external_cost * MUSD / GUSD)
+    assert np.allclose(pair.discount_sweep(rates)["Cost difference"],
+                       sweep["Total cost"] - pair.BAU.discount_sweep(rates)["Total cost"])
+
+
+def test_breakeven_discount_rate():
+    """At the break-even discount rate, both plans cost the same."""
+    parameter = ENSEMBLE[0]._replace(carbon_price=ENSEMBLE[0].carbon_price * 3)
+    rates = RunPair(baseline, withCCS, parameter).breakeven_discount_rates(with_carbon=True)
+    assert len(rates) == 1
+    pair = RunPair(baseline, withCCS, parameter._replace(discount_rate=rates[0]))
+    bau = pair.BAU.total_cost + pair.BAU.total_external_cost
+    alt = pair.ALT.total_cost + pair.ALT.total_external_cost
+    assert np.isclose(alt, bau, rtol=1e-9)
+
+
+def test_breakeven_carbon_price_scale():
+    """At the break-even multiplier of the carbon price, both plans cost the same with CO2."""
+    pair = RunPair(baseline, withCCS, ENSEMBLE[0])
+    scale = pair.breakeven_carbon_price_scale()
+    parameter = ENSEMBLE[0]._replace(carbon_price=ENSEMBLE[0].carbon_price * scale)
+    scaled = RunPair(baseline, withCCS, parameter)
+    assert np.isclose(scaled.ALT.total_cost + scaled.ALT.total_external_cost,
+                      scaled.BAU.total_cost + scaled.BAU.total_external_cost, rtol=1e-12)
+    curve = pair.breakeven_carbon_price_scale([0.0, ENSEMBLE[0].discount_rate])
+    assert np.isclose(curve.iloc[-1], scale, rtol=1e-12)
+    scales = RunPair.breakeven_carbon_price_scales(baseline, withCCS, ENSEMBLE)
+    for parameter, value in zip(ENSEMBLE, scales):
+        assert np.isclose(RunPair(baseline, withCCS, parameter).breakeven_carbon_price_scale(),
+                          value, rtol=1e-12)
+
+
+def test_parallel_multiple_lcoe():
+    """A Monte Carlo spread over a process pool gives the serial results, bit for bit."""
+    serial = multiple_LCOE(baseline, 25, root_seed=7)
+    parallel = multiple_LCOE(baseline, 25, root_seed=7, workers=2)
+    parallel.chunk_size = 4
+    assert parallel.multiple_run() == serial.multiple_run()
+    assert pickle.loads(pickle.dumps(withCCS)).fingerprint == withCCS.fingerprint